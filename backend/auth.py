@@ -1,25 +1,236 @@
+import asyncio
+import hashlib
+import time
+import jwt
+from collections import OrderedDict
 from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel
 from supabase import Client
+from typing import Any, Dict, Optional, Tuple
+from backend.config import settings
 from backend.database import get_supabase_client
 
 security = HTTPBearer()
 
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+class AuthenticatedUser(BaseModel):
+    """User built from the claims of a locally verified Supabase JWT"""
+    id: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    role: Optional[str] = None
+    aud: Optional[str] = None
+    app_metadata: Dict[str, Any] = {}
+    user_metadata: Dict[str, Any] = {}
+
+class MissingVerificationKey(Exception):
+    """No local key is configured for the token's signing algorithm"""
+
+class TokenCache:
+    """
+    Bounded LRU of validated tokens keyed by a hash of the token
+    
+    Entries never outlive the token's exp or the configured TTL, which is also the window
+    after which a revocation made elsewhere takes effect. Tokens purged here are remembered
+    until they expire so they are rejected even when they would still verify locally.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: int, max_token_lifetime: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.max_token_lifetime = max_token_lifetime
+        self.hits = 0
+        self.misses = 0
+        # token hash -> (expires_at, user id, user)
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        # token hash -> token exp
+        self._revoked: Dict[str, float] = {}
+        # user id -> tokens issued before this time are rejected
+        self._revoked_before: Dict[str, float] = {}
+    
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str) -> Optional[Any]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+    
+    def put(self, token: str, user: Any, claims: Dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        
+        expires_at = time.time() + self.ttl_seconds
+        if claims.get("exp"):
+            expires_at = min(expires_at, float(claims["exp"]))
+        
+        key = self._key(token)
+        self._entries[key] = (expires_at, str(user.id), user)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def is_revoked(self, token: str, claims: Dict[str, Any]) -> bool:
+        if self._key(token) in self._revoked:
+            return True
+        
+        revoked_before = self._revoked_before.get(str(claims.get("sub")))
+        # iat has whole-second precision; a token issued in the revocation's second is let through
+        # so logging straight back in works
+        return revoked_before is not None and float(claims.get("iat", 0)) < int(revoked_before)
+    
+    def purge_token(self, token: str, claims: Optional[Dict[str, Any]] = None) -> None:
+        """Forget a token and reject it until it expires (logout)"""
+        key = self._key(token)
+        self._entries.pop(key, None)
+        self._revoked[key] = float((claims or {}).get("exp") or time.time() + self.ttl_seconds)
+        self._prune_revocations()
+    
+    def purge_user(self, user_id: str) -> None:
+        """Forget every cached token of a user and reject tokens issued before now"""
+        user_id = str(user_id)
+        for key in [k for k, entry in self._entries.items() if entry[1] == user_id]:
+            del self._entries[key]
+        self._revoked_before[user_id] = time.time()
+        self._prune_revocations()
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def _prune_revocations(self) -> None:
+        now = time.time()
+        for key in [k for k, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[key]
+        
+        # Every token issued before the cutoff has expired by now
+        for user_id in [u for u, revoked_at in self._revoked_before.items() if revoked_at + self.max_token_lifetime <= now]:
+            del self._revoked_before[user_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "revoked_tokens": len(self._revoked),
+            "revoked_users": len(self._revoked_before)
+        }
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE,
+    settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+    settings.SUPABASE_JWT_MAX_LIFETIME_SECONDS
+)
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    global _jwks_client
+    
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(
+            f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=settings.SUPABASE_JWKS_CACHE_SECONDS
+        )
+    
+    return _jwks_client
+
+async def verify_token_locally(token: str) -> Dict[str, Any]:
+    """Check signature, expiry and audience of a Supabase JWT and return its claims"""
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    
+    if algorithm == "HS256":
+        if not settings.SUPABASE_JWT_SECRET:
+            raise MissingVerificationKey("SUPABASE_JWT_SECRET is not configured")
+        key = settings.SUPABASE_JWT_SECRET
+    elif algorithm in ("RS256", "ES256"):
+        # Signing keys are fetched once and cached by the JWKS client; the fetch is blocking I/O
+        signing_key = await asyncio.to_thread(_get_jwks_client().get_signing_key_from_jwt, token)
+        key = signing_key.key
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+    
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]}
+    )
+
+def user_from_claims(claims: Dict[str, Any]) -> AuthenticatedUser:
+    return AuthenticatedUser(
+        id=claims["sub"],
+        email=claims.get("email"),
+        phone=claims.get("phone"),
+        role=claims.get("role"),
+        aud=claims.get("aud"),
+        app_metadata=claims.get("app_metadata") or {},
+        user_metadata=claims.get("user_metadata") or {}
+    )
+
+async def verify_token_remotely(token: str):
+    """Validate the token against the Supabase auth server"""
+    supabase: Client = get_supabase_client()
+    user = await asyncio.to_thread(supabase.auth.get_user, token)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+        )
+    
+    return user.user
+
+def unverified_claims(token: str) -> Dict[str, Any]:
+    """Read the claims of a token that has already been validated"""
+    return jwt.decode(token, options={"verify_signature": False})
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)):
     """Verify JWT token and return user"""
     token = credentials.credentials
     
     try:
-        supabase: Client = get_supabase_client()
-        user = supabase.auth.get_user(token)
+        claims = unverified_claims(token)
         
-        if not user:
+        if token_cache.is_revoked(token, claims):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
+                detail="Token has been revoked",
             )
         
-        return {"user": user.user, "token": token}
+        user = token_cache.get(token)
+        
+        if user is None:
+            if settings.AUTH_VERIFICATION_MODE == "remote":
+                user = await verify_token_remotely(token)
+            else:
+                try:
+                    user = user_from_claims(await verify_token_locally(token))
+                except MissingVerificationKey:
+                    # Fall back to the auth server when no local key is available
+                    user = await verify_token_remotely(token)
+            
+            token_cache.put(token, user, claims)
+        
+        return {"user": user, "token": token}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -6,12 +6,69 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
+    SUPABASE_MAX_CONNECTIONS: int = 50
+    SUPABASE_TIMEOUT_SECONDS: float = 30.0
+    
+    # Auth: "local" verifies JWTs in-process, "remote" asks the Supabase auth server
+    AUTH_VERIFICATION_MODE: str = "local"
+    SUPABASE_JWT_SECRET: str = ""
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    SUPABASE_JWKS_CACHE_SECONDS: int = 600
+    # Longest access token lifetime (Supabase "JWT expiry"); per-user revocations are kept this long
+    SUPABASE_JWT_MAX_LIFETIME_SECONDS: int = 3600
+    # Validated tokens are cached for at most this long (also the revocation window)
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 60
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
     
     # Database
     DATABASE_URL: str
     
     # OpenAI
     OPENAI_API_KEY: str
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_MAX_CONNECTIONS: int = 20
+    OPENAI_MAX_CONCURRENCY: int = 8
+    
+    # Cache of AI generations: "memory", "sqlite" or "none"
+    GENERATION_CACHE_BACKEND: str = "memory"
+    GENERATION_CACHE_PATH: str = "generation_cache.sqlite3"
+    GENERATION_CACHE_TTL_SECONDS: int = 86400
+    GENERATION_CACHE_MAX_ENTRIES: int = 5000
+    GENERATION_CACHE_ENDPOINTS: List[str] = ["recipe_suggestions", "exercise_recommendations"]
+    
+    # Local recipe and exercise catalog consulted before the LLM: "sqlite" or "none"
+    CATALOG_BACKEND: str = "sqlite"
+    CATALOG_PATH: str = "catalog.sqlite3"
+    CATALOG_SEED_PATH: str = ""
+    CATALOG_MIN_MATCHES: int = 5
+    CATALOG_MAX_RESULTS: int = 10
+    
+    # Per-user context cache for the generators (0 disables caching)
+    USER_CONTEXT_TTL_SECONDS: int = 60
+    USER_CONTEXT_CACHE_SIZE: int = 1024
+    
+    # Meal nutrition checks: allowed miss of a meal's calorie target, and share of ingredients
+    # that must be found in the composition table to trust ingredient-level macros
+    NUTRITION_CALORIE_TOLERANCE: float = 0.15
+    NUTRITION_MIN_COVERAGE: float = 0.8
+    
+    # Scheduler
+    SCHEDULER_DAY_CONCURRENCY: int = 3
+    BULK_INSERT_CHUNK_SIZE: int = 500
+    # Schedule range reads cached per user until their workouts or meals change (0 disables)
+    SCHEDULE_CACHE_TTL_SECONDS: int = 60
+    SCHEDULE_CACHE_MAX_ENTRIES: int = 5000
+    
+    # Page size of the workout and meal list endpoints
+    LIST_DEFAULT_LIMIT: int = 100
+    LIST_MAX_LIMIT: int = 500
+    
+    # Background jobs: "memory" or "sqlite" store
+    JOB_WORKERS: int = 2
+    JOB_STORE_BACKEND: str = "memory"
+    JOB_STORE_PATH: str = "jobs.sqlite3"
+    JOB_RETENTION_SECONDS: int = 86400
     
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "https://*.vercel.app"]
@@ -19,6 +76,26 @@ class Settings(BaseSettings):
     # External APIs
     STRAVA_CLIENT_ID: str = ""
     STRAVA_CLIENT_SECRET: str = ""
+    STRAVA_MAX_CONNECTIONS: int = 20
+    STRAVA_TIMEOUT_SECONDS: float = 15.0
+    STRAVA_TOKEN_REFRESH_MARGIN_SECONDS: int = 300
+    STRAVA_STATS_TTL_SECONDS: int = 300
+    STRAVA_STATS_STALE_SECONDS: int = 3600
+    STRAVA_SYNC_PAGE_SIZE: int = 100
+    STRAVA_PUSH_CONCURRENCY: int = 4
+    STRAVA_PUSH_MAX_WORKOUTS: int = 50
+    # App-wide Strava quotas, corrected from the X-RateLimit-* response headers
+    STRAVA_RATE_LIMIT_15_MIN: int = 200
+    STRAVA_RATE_LIMIT_DAILY: int = 2000
+    STRAVA_INTERACTIVE_RESERVE: float = 0.2
+    STRAVA_INTERACTIVE_MAX_WAIT_SECONDS: float = 5.0
+    STRAVA_BULK_MAX_WAIT_SECONDS: float = 120.0
+    # Push subscription: verify token chosen when creating it, and its id (0 accepts any)
+    STRAVA_WEBHOOK_VERIFY_TOKEN: str = ""
+    STRAVA_WEBHOOK_SUBSCRIPTION_ID: int = 0
+    STRAVA_WEBHOOK_WORKERS: int = 2
+    STRAVA_WEBHOOK_COALESCE_SECONDS: float = 5.0
+    STRAVA_SYNC_PREFETCH_PAGES: int = 1
     NUTRITION_API_KEY: str = ""
     
     class Config:
@@ -1,12 +1,93 @@
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import httpx
+from postgrest import SyncRequestBuilder, SyncRPCFilterRequestBuilder
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
 from supabase import create_client, Client
 from backend.config import settings
 
+_rest_session: Optional[httpx.Client] = None
+
+# Scoped client of the current request, set by the get_user_supabase dependency
+_request_client: ContextVar[Optional["UserSupabaseClient"]] = ContextVar("request_supabase_client", default=None)
+
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Create and return a Supabase client"""
+    """Return the process-wide service-role Supabase client"""
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
-def get_supabase_user_client(access_token: str) -> Client:
-    """Create a Supabase client with user's access token for RLS"""
-    supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
-    supabase.auth.set_session(access_token, "")
-    return supabase
+def _get_rest_session() -> httpx.Client:
+    """Return the pooled HTTP session to PostgREST shared by every user client"""
+    global _rest_session
+
+    if _rest_session is None:
+        _rest_session = httpx.Client(
+            base_url=f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": settings.SUPABASE_ANON_KEY,
+                "Accept-Profile": "public",
+                "Content-Profile": "public",
+            },
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_MAX_CONNECTIONS
+            ),
+            timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            http2=True,
+        )
+
+    return _rest_session
+
+def close_supabase_clients() -> None:
+    """Close pooled connections (called on application shutdown)"""
+    global _rest_session
+
+    if _rest_session is not None:
+        _rest_session.close()
+        _rest_session = None
+
+class _ScopedSession:
+    """Adds the user's JWT to every request sent through the shared session"""
+
+    def __init__(self, session: httpx.Client, access_token: str):
+        self._session = session
+        self._authorization = f"Bearer {access_token}"
+
+    def request(self, method: str, url: str, *, headers: Any = None, **kwargs) -> httpx.Response:
+        headers = httpx.Headers(headers)
+        headers["Authorization"] = self._authorization
+        return self._session.request(method, url, headers=headers, **kwargs)
+
+class UserSupabaseClient:
+    """PostgREST client scoped to one user's access token so RLS applies"""
+
+    def __init__(self, access_token: str):
+        self.access_token = access_token
+        self._session = _ScopedSession(_get_rest_session(), access_token)
+
+    def table(self, table_name: str) -> SyncRequestBuilder:
+        return SyncRequestBuilder(self._session, f"/{table_name}")
+
+    def from_(self, table_name: str) -> SyncRequestBuilder:
+        return self.table(table_name)
+
+    def rpc(self, func: str, params: Optional[Dict[str, Any]] = None) -> SyncRPCFilterRequestBuilder:
+        return SyncRPCFilterRequestBuilder(self._session, f"/rpc/{func}", "POST", httpx.Headers(), httpx.QueryParams(), json=params or {})
+
+def get_supabase_user_client(access_token: str) -> UserSupabaseClient:
+    """Return a Supabase client with user's access token for RLS, reusing the request's client"""
+    client = _request_client.get()
+
+    if client is not None and client.access_token == access_token:
+        return client
+
+    return UserSupabaseClient(access_token)
+
+def set_request_client(access_token: str) -> UserSupabaseClient:
+    """Create the scoped client for the current request"""
+    client = UserSupabaseClient(access_token)
+    _request_client.set(client)
+    return client
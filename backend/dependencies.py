@@ -0,0 +1,7 @@
+from fastapi import Depends
+from backend.auth import get_current_user
+from backend.database import UserSupabaseClient, set_request_client
+
+async def get_user_supabase(current_user: dict = Depends(get_current_user)) -> UserSupabaseClient:
+    """Scoped Supabase client for the authenticated user, shared by the route and the services it calls"""
+    return set_request_client(current_user["token"])
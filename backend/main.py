@@ -1,12 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import workouts, meals, health, profile, integrations, ai_workouts, ai_meals, scheduler, strava
+from backend.routers import workouts, meals, health, profile, integrations, ai_workouts, ai_meals, scheduler, strava, session, jobs
+from backend.services.llm_client import close_llm_client
+from backend.database import close_supabase_clients
+from backend.auth import token_cache
+from backend.services.generation_cache import generation_cache
+from backend.services.catalog import catalog
+from backend.services.jobs import job_queue
+from backend.services.schedule_cache import schedule_cache
+from backend.services.strava_integration import open_strava_client, close_strava_client
+from backend.services.strava_rate_limit import rate_limiter
+from backend.services.strava_webhooks import webhook_ingestor
 from backend.config import settings
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.CATALOG_SEED_PATH:
+        await catalog.load_seed(settings.CATALOG_SEED_PATH)
+    await open_strava_client()
+    await job_queue.start()
+    await webhook_ingestor.start()
+    yield
+    await webhook_ingestor.stop()
+    await job_queue.stop()
+    # Release pooled connections on shutdown
+    await close_llm_client()
+    await close_strava_client()
+    close_supabase_clients()
+
 app = FastAPI(
     title="AI Planner API",
     description="Backend API for AI-powered fitness and meal planning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -16,15 +43,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Schedule-Version"],
 )
 
 # Include routers
+app.include_router(session.router, prefix="/api/auth", tags=["auth"])
 app.include_router(profile.router, prefix="/api/profile", tags=["profile"])
 app.include_router(workouts.router, prefix="/api/workouts", tags=["workouts"])
 app.include_router(ai_workouts.router, prefix="/api/ai/workouts", tags=["ai-workouts"])
 app.include_router(meals.router, prefix="/api/meals", tags=["meals"])
 app.include_router(ai_meals.router, prefix="/api/ai/meals", tags=["ai-meals"])
 app.include_router(scheduler.router, prefix="/api/scheduler", tags=["scheduler"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 app.include_router(health.router, prefix="/api/health", tags=["health"])
 app.include_router(integrations.router, prefix="/api/integrations", tags=["integrations"])
 app.include_router(strava.router, prefix="/api/strava", tags=["strava"])
@@ -36,3 +66,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "token_cache": token_cache.stats(),
+        "generation_cache": generation_cache.stats(),
+        "catalog": catalog.stats(),
+        "schedule_cache": schedule_cache.stats(),
+        "strava_rate_limit": rate_limiter.stats(),
+        "strava_webhooks": webhook_ingestor.stats()
+    }
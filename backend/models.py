@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import date, time, datetime
 from uuid import UUID
 
@@ -50,6 +50,26 @@ class Workout(WorkoutBase):
     created_at: datetime
     updated_at: datetime
 
+# Workout row as listed, limited to the selected columns
+class WorkoutListItem(BaseModel):
+    id: UUID
+    scheduled_date: date
+    user_id: Optional[UUID] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    workout_type: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    calories_burned: Optional[int] = None
+    intensity: Optional[str] = None
+    scheduled_time: Optional[time] = None
+    notes: Optional[str] = None
+    completed: Optional[bool] = None
+    completed_at: Optional[datetime] = None
+    external_provider: Optional[str] = None
+    external_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 # Meal Models
 class MealBase(BaseModel):
     title: str
@@ -82,6 +102,28 @@ class Meal(MealBase):
     created_at: datetime
     updated_at: datetime
 
+# Meal row as listed, limited to the selected columns
+class MealListItem(BaseModel):
+    id: UUID
+    scheduled_date: date
+    user_id: Optional[UUID] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    meal_type: Optional[str] = None
+    calories: Optional[int] = None
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    fat_g: Optional[float] = None
+    # The AI planner stores a list of ingredients; older rows may hold an object
+    ingredients: Optional[Any] = None
+    recipe_url: Optional[str] = None
+    scheduled_time: Optional[time] = None
+    notes: Optional[str] = None
+    completed: Optional[bool] = None
+    completed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 # Health Tracking Models
 class SleepTrackingCreate(BaseModel):
     date: date
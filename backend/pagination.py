@@ -0,0 +1,72 @@
+import base64
+from datetime import date, datetime
+from uuid import UUID
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Columns every list row carries, since the cursor is built from them
+KEY_COLUMNS = ("id", "scheduled_date")
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past a row in (scheduled_date, id) order"""
+    raw = f"{row['scheduled_date']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _check_scheduled_date(value: str) -> None:
+    """Accept the date or timestamptz text PostgREST returns for scheduled_date"""
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def decode_cursor(cursor: str) -> Tuple[str, UUID]:
+    """
+    The scheduled_date exactly as the row carried it, and the row id
+    
+    The date is passed back to the filter untouched so date and timestamptz columns both work.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        scheduled_date, row_id = raw.split("|")
+        _check_scheduled_date(scheduled_date)
+        return scheduled_date, UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def select_columns(fields: Optional[str], columns: Sequence[str], heavy_columns: Sequence[str], compact: bool) -> str:
+    """
+    Build the select list for a list endpoint from `fields=` or the compact flag
+    
+    Explicit fields win over compact; unknown fields raise ValueError.
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(requested) - set(columns))
+        
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    elif compact:
+        requested = [column for column in columns if column not in heavy_columns]
+    else:
+        return "*"
+    
+    return ",".join(dict.fromkeys([*KEY_COLUMNS, *requested]))
+
+def fetch_page(query: Any, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Run a list query one keyset page at a time, ordered by (scheduled_date, id)
+    
+    Returns the rows and the cursor of the next page, or None on the last page.
+    """
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        # Timestamps contain colons and dots, which must be quoted inside or=
+        query = query.or_(f'scheduled_date.gt."{after_date}",and(scheduled_date.eq."{after_date}",id.gt.{after_id})')
+    
+    # One extra row tells whether another page exists without a count query
+    result = query.order("scheduled_date").order("id").limit(limit + 1).execute()
+    rows = result.data or []
+    
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    
+    return rows, None
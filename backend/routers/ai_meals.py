@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from backend.auth import get_current_user
-from backend.services.ai_meal_planner import generate_meal, generate_daily_meal_plan, generate_weekly_meal_plan, get_recipe_suggestions
-from backend.database import get_supabase_user_client
+from backend.services.ai_meal_planner import generate_meal, stream_meal, generate_daily_meal_plan, generate_weekly_meal_plan, get_recipe_suggestions
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.streaming import ndjson_response
+from backend.services.schedule_cache import schedule_cache
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date, timedelta
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(get_user_supabase)])
 
 class MealGenerationRequest(BaseModel):
     meal_type: str  # breakfast, lunch, dinner, snack
@@ -54,12 +57,37 @@ async def create_ai_meal(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate meal: {str(e)}")
 
+@router.post("/generate/stream")
+async def stream_ai_meal(
+    request: MealGenerationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Generate a personalized meal using AI, streaming model output as NDJSON events
+    """
+    preferences = {
+        "cuisine": request.cuisine,
+        "max_time": request.max_time,
+        "dietary_focus": request.dietary_focus
+    }
+    
+    return ndjson_response(
+        stream_meal(
+            user_id=str(current_user["user"].id),
+            token=current_user["token"],
+            meal_type=request.meal_type,
+            preferences=preferences
+        ),
+        error_detail="Failed to generate meal"
+    )
+
 @router.post("/generate-and-save")
 async def generate_and_save_meal(
     request: MealGenerationRequest,
     scheduled_date: date,
     scheduled_time: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """
     Generate a meal and save it to the user's schedule
@@ -79,8 +107,6 @@ async def generate_and_save_meal(
         )
         
         # Save to database
-        supabase = get_supabase_user_client(current_user["token"])
-        
         meal_record = {
             "user_id": str(current_user["user"].id),
             "title": meal_data["title"],
@@ -97,6 +123,7 @@ async def generate_and_save_meal(
         }
         
         result = supabase.table("meals").insert(meal_record).execute()
+        schedule_cache.invalidate(meal_record["user_id"])
         
         return {
             "success": True,
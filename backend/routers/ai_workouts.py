@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from backend.auth import get_current_user
-from backend.services.ai_workout_generator import generate_workout, generate_weekly_workout_plan, get_exercise_recommendations
-from backend.database import get_supabase_user_client
+from backend.services.ai_workout_generator import generate_workout, stream_workout, get_exercise_recommendations
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.streaming import ndjson_response
+from backend.services.scheduler import generate_weekly_workout_schedule
+from backend.services.jobs import job_queue, public_job
+from backend.services.schedule_cache import schedule_cache
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import date, timedelta
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(get_user_supabase)])
 
 class WorkoutGenerationRequest(BaseModel):
     workout_type: Optional[str] = None
@@ -47,12 +52,30 @@ async def create_ai_workout(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate workout: {str(e)}")
 
+@router.post("/generate/stream")
+async def stream_ai_workout(
+    request: WorkoutGenerationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Generate a personalized workout using AI, streaming model output as NDJSON events
+    """
+    return ndjson_response(
+        stream_workout(
+            user_id=str(current_user["user"].id),
+            token=current_user["token"],
+            preferences=request.model_dump(exclude_unset=True)
+        ),
+        error_detail="Failed to generate workout"
+    )
+
 @router.post("/generate-and-save")
 async def generate_and_save_workout(
     request: WorkoutGenerationRequest,
     scheduled_date: date,
     scheduled_time: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """
     Generate a workout and save it to the user's schedule
@@ -66,8 +89,6 @@ async def generate_and_save_workout(
         )
         
         # Save to database
-        supabase = get_supabase_user_client(current_user["token"])
-        
         workout_record = {
             "user_id": str(current_user["user"].id),
             "title": workout_data["title"],
@@ -82,6 +103,7 @@ async def generate_and_save_workout(
         }
         
         result = supabase.table("workouts").insert(workout_record).execute()
+        schedule_cache.invalidate(workout_record["user_id"])
         
         return {
             "success": True,
@@ -101,33 +123,14 @@ async def create_weekly_plan(
     Generate a complete weekly workout plan
     """
     try:
-        plan = await generate_weekly_workout_plan(
+        weekly_plan = await generate_weekly_workout_schedule(
             user_id=str(current_user["user"].id),
             token=current_user["token"],
+            start_date=request.start_date,
             days_per_week=request.days_per_week
         )
-        
-        # Save workouts to database
-        supabase = get_supabase_user_client(current_user["token"])
-        
-        saved_workouts = []
-        for day_plan in plan:
-            if day_plan["workout_type"] != "rest":
-                workout_date = request.start_date + timedelta(days=day_plan["day"] - 1)
-                
-                workout_record = {
-                    "user_id": str(current_user["user"].id),
-                    "title": day_plan["title"],
-                    "description": day_plan["description"],
-                    "workout_type": day_plan["workout_type"],
-                    "duration_minutes": day_plan["duration_minutes"],
-                    "intensity": day_plan["intensity"],
-                    "scheduled_date": workout_date.isoformat(),
-                    "notes": f"Focus: {day_plan.get('focus', '')}"
-                }
-                
-                result = supabase.table("workouts").insert(workout_record).execute()
-                saved_workouts.append(result.data[0])
+        plan = weekly_plan["plan"]
+        saved_workouts = weekly_plan["saved_workouts"]
         
         return {
             "success": True,
@@ -138,6 +141,34 @@ async def create_weekly_plan(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate weekly plan: {str(e)}")
 
+@router.post("/weekly-plan/jobs", status_code=202)
+async def submit_weekly_plan_job(
+    request: WeeklyPlanRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Queue weekly workout plan generation and return the job to poll at /api/jobs/{id}
+    """
+    user_id = str(current_user["user"].id)
+    token = current_user["token"]
+    
+    async def run(progress):
+        # Generated in one completion, so only the job status changes
+        return await generate_weekly_workout_schedule(
+            user_id=user_id,
+            token=token,
+            start_date=request.start_date,
+            days_per_week=request.days_per_week
+        )
+    
+    job = job_queue.submit(user_id, "weekly_workout_plan", request.start_date.isoformat(), run)
+    
+    return {
+        "success": True,
+        "job": public_job(job),
+        "message": "Weekly plan generation queued"
+    }
+
 @router.post("/exercise-recommendations")
 async def get_recommendations(
     request: ExerciseRecommendationRequest,
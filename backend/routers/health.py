@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from backend.auth import get_current_user
 from backend.models import SleepTrackingCreate, WeightTrackingCreate, WaterIntakeCreate
-from backend.database import get_supabase_user_client
-from typing import List, Optional
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.services.health_rollups import rollup_range, fetch_rollup
+from typing import List, Literal, Optional
 from datetime import date
 
 router = APIRouter()
 
+RollupPeriod = Literal["day", "week", "month"]
+
+def _rollup(supabase: UserSupabaseClient, function: str, period: str, start_date: Optional[date], end_date: Optional[date], **params):
+    try:
+        start_date, end_date = rollup_range(period, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return fetch_rollup(supabase, function, period, start_date, end_date, **params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute rollup: {str(e)}")
+
 @router.post("/sleep")
-async def track_sleep(sleep_data: SleepTrackingCreate, current_user: dict = Depends(get_current_user)):
+async def track_sleep(sleep_data: SleepTrackingCreate, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Track sleep data"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     data = sleep_data.model_dump()
     data["user_id"] = str(current_user["user"].id)
     
@@ -23,11 +36,10 @@ async def track_sleep(sleep_data: SleepTrackingCreate, current_user: dict = Depe
 async def get_sleep_data(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """Get sleep tracking data"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     query = supabase.table("sleep_tracking").select("*").eq("user_id", current_user["user"].id)
     
     if start_date:
@@ -40,10 +52,8 @@ async def get_sleep_data(
     return result.data
 
 @router.post("/weight")
-async def track_weight(weight_data: WeightTrackingCreate, current_user: dict = Depends(get_current_user)):
+async def track_weight(weight_data: WeightTrackingCreate, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Track weight data"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     data = weight_data.model_dump()
     data["user_id"] = str(current_user["user"].id)
     
@@ -55,11 +65,10 @@ async def track_weight(weight_data: WeightTrackingCreate, current_user: dict = D
 async def get_weight_data(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """Get weight tracking data"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     query = supabase.table("weight_tracking").select("*").eq("user_id", current_user["user"].id)
     
     if start_date:
@@ -72,10 +81,8 @@ async def get_weight_data(
     return result.data
 
 @router.post("/water")
-async def track_water(water_data: WaterIntakeCreate, current_user: dict = Depends(get_current_user)):
+async def track_water(water_data: WaterIntakeCreate, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Track water intake"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     data = water_data.model_dump()
     data["user_id"] = str(current_user["user"].id)
     
@@ -87,11 +94,10 @@ async def track_water(water_data: WaterIntakeCreate, current_user: dict = Depend
 async def get_water_data(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """Get water intake data"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     query = supabase.table("water_intake").select("*").eq("user_id", current_user["user"].id)
     
     if start_date:
@@ -102,3 +108,34 @@ async def get_water_data(
     result = query.order("date", desc=True).execute()
     
     return result.data
+
+@router.get("/water/rollup")
+async def get_water_rollup(
+    period: RollupPeriod = "day",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
+):
+    """Get water intake totals per day, week or month"""
+    return _rollup(supabase, "health_water_rollup", period, start_date, end_date)
+
+@router.get("/weight/rollup")
+async def get_weight_rollup(
+    period: RollupPeriod = "week",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    window_days: int = Query(default=7, ge=1, le=90),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
+):
+    """Get weight averages and the rolling average per day, week or month"""
+    return _rollup(supabase, "health_weight_rollup", period, start_date, end_date, p_window_days=window_days)
+
+@router.get("/sleep/rollup")
+async def get_sleep_rollup(
+    period: RollupPeriod = "week",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
+):
+    """Get sleep duration and quality averages per day, week or month"""
+    return _rollup(supabase, "health_sleep_rollup", period, start_date, end_date)
@@ -1,26 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
 from backend.auth import get_current_user
-from backend.database import get_supabase_user_client
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.services.strava_integration import forget_access_token, forget_athlete_stats
 
 router = APIRouter()
 
 @router.get("/")
-async def get_integrations(current_user: dict = Depends(get_current_user)):
+async def get_integrations(current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Get user's connected integrations"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("external_integrations").select("id, provider, connected_at, last_synced_at, is_active").eq("user_id", current_user["user"].id).execute()
     
     return result.data
 
 @router.delete("/{integration_id}")
-async def disconnect_integration(integration_id: str, current_user: dict = Depends(get_current_user)):
+async def disconnect_integration(integration_id: str, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Disconnect an integration"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("external_integrations").delete().eq("id", integration_id).eq("user_id", current_user["user"].id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Integration not found")
     
+    if any(row.get("provider") == "strava" for row in result.data):
+        # Don't keep serving the revoked connection's token or stats from memory
+        forget_access_token(str(current_user["user"].id))
+        forget_athlete_stats(str(current_user["user"].id))
+    
     return {"message": "Integration disconnected successfully"}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from backend.auth import get_current_user
+from backend.services.jobs import job_queue, public_job
+from backend.streaming import ndjson_response
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the status, per-day progress and result of a background job"""
+    job = job_queue.get(job_id, str(current_user["user"].id))
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return public_job(job)
+
+@router.get("/{job_id}/events")
+async def stream_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Stream the job as NDJSON after every progress change until it finishes"""
+    if job_queue.get(job_id, str(current_user["user"].id)) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        async for job in job_queue.subscribe(job_id):
+            yield public_job(job)
+    
+    return ndjson_response(events(), error_detail="Failed to stream job")
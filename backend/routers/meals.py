@@ -1,41 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from backend.auth import get_current_user
-from backend.models import Meal, MealCreate, MealUpdate
-from backend.database import get_supabase_user_client
+from backend.models import Meal, MealCreate, MealUpdate, MealListItem
+from backend.config import settings
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.pagination import fetch_page, select_columns
+from backend.services.schedule_cache import schedule_cache
 from typing import List, Optional
 from datetime import date
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Meal])
+# Columns left out of compact list rows
+HEAVY_COLUMNS = ("notes", "ingredients")
+
+@router.get("/", response_model=List[MealListItem], response_model_exclude_unset=True)
 async def get_meals(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.LIST_DEFAULT_LIMIT, ge=1, le=settings.LIST_MAX_LIMIT),
+    fields: Optional[str] = None,
+    compact: bool = False,
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
-    """Get user's meals with optional date filtering"""
-    supabase = get_supabase_user_client(current_user["token"])
+    """
+    Get one page of the user's meals with optional date filtering
+    
+    Pass the X-Next-Cursor response header back as `cursor` for the next page. `fields` is a
+    comma-separated list of columns to return; `compact` drops notes and ingredients.
+    """
+    try:
+        columns = select_columns(fields, list(MealListItem.model_fields), HEAVY_COLUMNS, compact)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    query = supabase.table("meals").select("*").eq("user_id", current_user["user"].id)
+    query = supabase.table("meals").select(columns).eq("user_id", current_user["user"].id)
     
     if start_date:
         query = query.gte("scheduled_date", start_date.isoformat())
     if end_date:
         query = query.lte("scheduled_date", end_date.isoformat())
     
-    result = query.order("scheduled_date").execute()
+    try:
+        rows, next_cursor = fetch_page(query, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return result.data
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return rows
 
 @router.post("/", response_model=Meal)
-async def create_meal(meal: MealCreate, current_user: dict = Depends(get_current_user)):
+async def create_meal(meal: MealCreate, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Create a new meal"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     meal_data = meal.model_dump()
     meal_data["user_id"] = str(current_user["user"].id)
     
     result = supabase.table("meals").insert(meal_data).execute()
+    schedule_cache.invalidate(meal_data["user_id"])
     
     return result.data[0]
 
@@ -43,26 +69,27 @@ async def create_meal(meal: MealCreate, current_user: dict = Depends(get_current
 async def update_meal(
     meal_id: str,
     meal_update: MealUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """Update a meal"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("meals").update(meal_update.model_dump(exclude_unset=True)).eq("id", meal_id).eq("user_id", current_user["user"].id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Meal not found")
     
+    schedule_cache.invalidate(str(current_user["user"].id))
+    
     return result.data[0]
 
 @router.delete("/{meal_id}")
-async def delete_meal(meal_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_meal(meal_id: str, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Delete a meal"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("meals").delete().eq("id", meal_id).eq("user_id", current_user["user"].id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Meal not found")
     
+    schedule_cache.invalidate(str(current_user["user"].id))
+    
     return {"message": "Meal deleted successfully"}
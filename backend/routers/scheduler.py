@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from backend.auth import get_current_user
+from backend.dependencies import get_user_supabase
 from backend.services.scheduler import (
     generate_daily_schedule,
+    stream_daily_schedule,
     generate_weekly_schedule,
     get_schedule,
     update_schedule_item,
     delete_schedule_item
 )
+from backend.streaming import ndjson_response
+from backend.services.jobs import job_queue, public_job
+from backend.services.schedule_cache import schedule_cache
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-from datetime import date
+from datetime import date, timedelta
+import hashlib
+import json
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(get_user_supabase)])
 
 class DailyScheduleRequest(BaseModel):
     date: date
@@ -23,6 +31,7 @@ class WeeklyScheduleRequest(BaseModel):
 class ScheduleRangeRequest(BaseModel):
     start_date: date
     end_date: date
+    fill_empty_days: bool = False
 
 class UpdateScheduleItemRequest(BaseModel):
     item_type: str  # "workout" or "meal"
@@ -52,6 +61,23 @@ async def create_daily_schedule(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate daily schedule: {str(e)}")
 
+@router.post("/daily/stream")
+async def stream_daily_schedule_generation(
+    request: DailyScheduleRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Generate a daily schedule, streaming the workout and each meal as NDJSON events as they finish
+    """
+    return ndjson_response(
+        stream_daily_schedule(
+            user_id=str(current_user["user"].id),
+            token=current_user["token"],
+            target_date=request.date
+        ),
+        error_detail="Failed to generate daily schedule"
+    )
+
 @router.post("/weekly")
 async def create_weekly_schedule(
     request: WeeklyScheduleRequest,
@@ -76,29 +102,90 @@ async def create_weekly_schedule(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate weekly schedule: {str(e)}")
 
+@router.post("/weekly/jobs", status_code=202)
+async def submit_weekly_schedule_job(
+    request: WeeklyScheduleRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Queue weekly schedule generation and return the job to poll at /api/jobs/{id}
+    """
+    user_id = str(current_user["user"].id)
+    token = current_user["token"]
+    
+    async def run(progress):
+        progress.set_days([(request.start_date + timedelta(days=day_num)).isoformat() for day_num in range(7)])
+        return await generate_weekly_schedule(
+            user_id=user_id,
+            token=token,
+            start_date=request.start_date,
+            days_per_week=request.days_per_week,
+            on_day_complete=progress.day_done
+        )
+    
+    job = job_queue.submit(user_id, "weekly_schedule", request.start_date.isoformat(), run)
+    
+    return {
+        "success": True,
+        "job": public_job(job),
+        "message": "Weekly schedule generation queued"
+    }
+
+def _etag(payload: Dict[str, Any]) -> str:
+    """Weak validator derived from a response body"""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
 @router.post("/get")
 async def get_schedule_range(
     request: ScheduleRangeRequest,
+    http_request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get existing schedule for a date range
+    
+    The response carries an ETag; sending it back in If-None-Match returns 304 when the
+    range is unchanged. X-Schedule-Version is the user's schedule version the data was read at.
     """
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    
     try:
         schedule = await get_schedule(
             user_id=str(current_user["user"].id),
             token=current_user["token"],
             start_date=request.start_date,
-            end_date=request.end_date
+            end_date=request.end_date,
+            fill_empty_days=request.fill_empty_days
         )
-        
-        return {
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get schedule: {str(e)}")
+    
+    # The version moves on writes outside the range too, so it is left out of the ETag
+    etag = _etag({key: value for key, value in schedule.items() if key != "version"})
+    headers = {"ETag": etag, "X-Schedule-Version": str(schedule["version"])}
+    
+    if etag in [tag.strip() for tag in http_request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(
+        {
             "success": True,
             "schedule": schedule,
             "message": "Schedule retrieved successfully"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get schedule: {str(e)}")
+        },
+        headers=headers
+    )
+
+@router.get("/version")
+async def get_schedule_version(current_user: dict = Depends(get_current_user)):
+    """
+    Get the user's schedule version, which changes whenever their workouts or meals change
+    
+    Clients can poll this and only fetch schedule ranges again when it moves.
+    """
+    return {"version": schedule_cache.version(str(current_user["user"].id))}
 
 @router.patch("/update")
 async def update_item(
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from backend.auth import get_current_user, token_cache, unverified_claims
+
+router = APIRouter()
+
+@router.post("/logout")
+async def logout(all_sessions: bool = False, current_user: dict = Depends(get_current_user)):
+    """Revoke the current token, or every token of the user, on this server"""
+    if all_sessions:
+        token_cache.purge_user(current_user["user"].id)
+    else:
+        token_cache.purge_token(current_user["token"], unverified_claims(current_user["token"]))
+    
+    return {"message": "Logged out successfully"}
@@ -6,15 +6,28 @@ from backend.services.strava_integration import (
     get_athlete_stats,
     get_activities,
     sync_activities,
-    create_activity
+    create_activity,
+    push_workouts,
+    record_pushed_activity,
+    cache_access_token,
+    forget_access_token,
+    forget_athlete_stats
 )
-from backend.database import get_supabase_user_client
+from backend.services.strava_rate_limit import RateLimitExceeded
+from backend.services.strava_webhooks import accepts_event, verify_subscription, webhook_ingestor
+from backend.config import settings
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+from datetime import date, datetime, timedelta, timezone
 
 router = APIRouter()
 
+def rate_limited(e: RateLimitExceeded) -> HTTPException:
+    """429 telling the client when the Strava quota will have room again"""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 class StravaConnectRequest(BaseModel):
     redirect_uri: str
 
@@ -23,10 +36,25 @@ class StravaCallbackRequest(BaseModel):
 
 class StravaSyncRequest(BaseModel):
     days: int = 7
+    full: bool = False  # Ignore the last sync and go back `days` days
 
 class StravaCreateActivityRequest(BaseModel):
     workout_id: str
 
+class StravaPushActivitiesRequest(BaseModel):
+    workout_ids: Optional[List[str]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+class StravaWebhookEvent(BaseModel):
+    object_type: str  # "activity" or "athlete"
+    object_id: int
+    aspect_type: str  # "create", "update" or "delete"
+    owner_id: int
+    subscription_id: int
+    event_time: int
+    updates: Optional[Dict[str, Any]] = None
+
 @router.post("/connect")
 async def connect_strava(
     request: StravaConnectRequest,
@@ -50,7 +78,8 @@ async def connect_strava(
 @router.post("/callback")
 async def strava_callback(
     request: StravaCallbackRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """
     Handle Strava OAuth callback
@@ -60,14 +89,12 @@ async def strava_callback(
         token_data = await exchange_code_for_token(request.code)
         
         # Save integration
-        supabase = get_supabase_user_client(current_user["token"])
-        
         integration_data = {
             "user_id": str(current_user["user"].id),
             "provider": "strava",
             "access_token": token_data["access_token"],
             "refresh_token": token_data["refresh_token"],
-            "token_expires_at": datetime.fromtimestamp(token_data["expires_at"]).isoformat(),
+            "token_expires_at": datetime.fromtimestamp(token_data["expires_at"], timezone.utc).isoformat(),
             "is_active": True,
             "metadata": {
                 "athlete_id": token_data["athlete"]["id"],
@@ -77,6 +104,7 @@ async def strava_callback(
         
         # Upsert integration
         result = supabase.table("external_integrations").upsert(integration_data, on_conflict="user_id,provider").execute()
+        cache_access_token(str(current_user["user"].id), token_data["access_token"], token_data["expires_at"])
         
         return {
             "success": True,
@@ -86,7 +114,7 @@ async def strava_callback(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to connect Strava: {str(e)}")
 
-@router.get("/stats")
+@router.get("/stats", dependencies=[Depends(get_user_supabase)])
 async def get_stats(current_user: dict = Depends(get_current_user)):
     """
     Get athlete statistics from Strava
@@ -102,10 +130,12 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
             "stats": stats,
             "message": "Stats retrieved successfully"
         }
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
-@router.get("/activities")
+@router.get("/activities", dependencies=[Depends(get_user_supabase)])
 async def get_strava_activities(
     days: int = Query(default=7, ge=1, le=90),
     current_user: dict = Depends(get_current_user)
@@ -127,10 +157,12 @@ async def get_strava_activities(
             "count": len(activities),
             "message": f"Retrieved {len(activities)} activities"
         }
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get activities: {str(e)}")
 
-@router.post("/sync")
+@router.post("/sync", dependencies=[Depends(get_user_supabase)])
 async def sync_strava_activities(
     request: StravaSyncRequest,
     current_user: dict = Depends(get_current_user)
@@ -142,7 +174,8 @@ async def sync_strava_activities(
         result = await sync_activities(
             user_id=str(current_user["user"].id),
             token=current_user["token"],
-            days=request.days
+            days=request.days,
+            full=request.full
         )
         
         return {
@@ -150,20 +183,22 @@ async def sync_strava_activities(
             "sync_result": result,
             "message": f"Synced {result['synced']} activities, skipped {result['skipped']} duplicates"
         }
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to sync activities: {str(e)}")
 
 @router.post("/create-activity")
 async def push_activity_to_strava(
     request: StravaCreateActivityRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """
     Push a workout to Strava as an activity
     """
     try:
         # Get workout
-        supabase = get_supabase_user_client(current_user["token"])
         workout_result = supabase.table("workouts").select("*").eq("id", request.workout_id).eq("user_id", current_user["user"].id).single().execute()
         
         if not workout_result.data:
@@ -171,30 +206,82 @@ async def push_activity_to_strava(
         
         workout = workout_result.data
         
+        if workout.get("external_id"):
+            return {
+                "success": True,
+                "activity": None,
+                "strava_activity_id": workout["external_id"],
+                "message": "Workout is already on Strava"
+            }
+        
         # Create activity on Strava
         activity = await create_activity(
             user_id=str(current_user["user"].id),
             token=current_user["token"],
             workout_data=workout
         )
+        record_pushed_activity(supabase, str(current_user["user"].id), workout["id"], activity["id"])
         
         return {
             "success": True,
             "activity": activity,
             "message": "Activity created on Strava successfully"
         }
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create activity: {str(e)}")
 
+@router.post("/push-activities", dependencies=[Depends(get_user_supabase)])
+async def push_activities_to_strava(
+    request: StravaPushActivitiesRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Push several workouts to Strava, selected by id or scheduled date range
+    """
+    if not request.workout_ids and not (request.start_date and request.end_date):
+        raise HTTPException(status_code=400, detail="Provide workout_ids or both start_date and end_date")
+    
+    if request.workout_ids and len(request.workout_ids) > settings.STRAVA_PUSH_MAX_WORKOUTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.STRAVA_PUSH_MAX_WORKOUTS} workouts can be pushed at once")
+    
+    if request.start_date and request.end_date and not 0 <= (request.end_date - request.start_date).days <= 31:
+        raise HTTPException(status_code=400, detail="Date range must be at most 31 days")
+    
+    try:
+        results = await push_workouts(
+            user_id=str(current_user["user"].id),
+            token=current_user["token"],
+            workout_ids=request.workout_ids,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            max_workouts=settings.STRAVA_PUSH_MAX_WORKOUTS
+        )
+        
+        created = sum(1 for result in results if result["status"] in ("created", "unrecorded"))
+        
+        return {
+            "success": True,
+            "results": results,
+            "message": f"Pushed {created} of {len(results)} workouts to Strava"
+        }
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to push activities: {str(e)}")
+
 @router.delete("/disconnect")
-async def disconnect_strava(current_user: dict = Depends(get_current_user)):
+async def disconnect_strava(current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """
     Disconnect Strava integration
     """
     try:
-        supabase = get_supabase_user_client(current_user["token"])
-        
         result = supabase.table("external_integrations").delete().eq("user_id", current_user["user"].id).eq("provider", "strava").execute()
+        forget_access_token(str(current_user["user"].id))
+        forget_athlete_stats(str(current_user["user"].id))
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Strava integration not found")
@@ -205,3 +292,30 @@ async def disconnect_strava(current_user: dict = Depends(get_current_user)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to disconnect Strava: {str(e)}")
+
+@router.get("/webhook")
+async def verify_strava_webhook(
+    mode: Optional[str] = Query(default=None, alias="hub.mode"),
+    challenge: str = Query(alias="hub.challenge"),
+    verify_token: Optional[str] = Query(default=None, alias="hub.verify_token")
+):
+    """
+    Answer Strava's push subscription validation request
+    """
+    if not verify_subscription(mode, verify_token):
+        raise HTTPException(status_code=403, detail="Invalid verify token")
+    
+    return {"hub.challenge": challenge}
+
+@router.post("/webhook")
+async def receive_strava_webhook(event: StravaWebhookEvent):
+    """
+    Receive a Strava push event and queue it for ingestion
+    """
+    if not accepts_event(event.subscription_id):
+        raise HTTPException(status_code=403, detail="Unknown subscription")
+    
+    # Strava expects an answer within two seconds, so the work happens in the background
+    webhook_ingestor.enqueue(event.model_dump())
+    
+    return {"success": True}
@@ -1,41 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from backend.auth import get_current_user
-from backend.models import Workout, WorkoutCreate, WorkoutUpdate
-from backend.database import get_supabase_user_client
+from backend.models import Workout, WorkoutCreate, WorkoutUpdate, WorkoutListItem
+from backend.config import settings
+from backend.database import UserSupabaseClient
+from backend.dependencies import get_user_supabase
+from backend.pagination import fetch_page, select_columns
+from backend.services.schedule_cache import schedule_cache
 from typing import List, Optional
 from datetime import date
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Workout])
+# Columns left out of compact list rows
+HEAVY_COLUMNS = ("notes",)
+
+@router.get("/", response_model=List[WorkoutListItem], response_model_exclude_unset=True)
 async def get_workouts(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.LIST_DEFAULT_LIMIT, ge=1, le=settings.LIST_MAX_LIMIT),
+    fields: Optional[str] = None,
+    compact: bool = False,
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
-    """Get user's workouts with optional date filtering"""
-    supabase = get_supabase_user_client(current_user["token"])
+    """
+    Get one page of the user's workouts with optional date filtering
+    
+    Pass the X-Next-Cursor response header back as `cursor` for the next page. `fields` is a
+    comma-separated list of columns to return; `compact` drops notes.
+    """
+    try:
+        columns = select_columns(fields, list(WorkoutListItem.model_fields), HEAVY_COLUMNS, compact)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    query = supabase.table("workouts").select("*").eq("user_id", current_user["user"].id)
+    query = supabase.table("workouts").select(columns).eq("user_id", current_user["user"].id)
     
     if start_date:
         query = query.gte("scheduled_date", start_date.isoformat())
     if end_date:
         query = query.lte("scheduled_date", end_date.isoformat())
     
-    result = query.order("scheduled_date").execute()
+    try:
+        rows, next_cursor = fetch_page(query, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return result.data
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return rows
 
 @router.post("/", response_model=Workout)
-async def create_workout(workout: WorkoutCreate, current_user: dict = Depends(get_current_user)):
+async def create_workout(workout: WorkoutCreate, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Create a new workout"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     workout_data = workout.model_dump()
     workout_data["user_id"] = str(current_user["user"].id)
     
     result = supabase.table("workouts").insert(workout_data).execute()
+    schedule_cache.invalidate(workout_data["user_id"])
     
     return result.data[0]
 
@@ -43,26 +69,27 @@ async def create_workout(workout: WorkoutCreate, current_user: dict = Depends(ge
 async def update_workout(
     workout_id: str,
     workout_update: WorkoutUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    supabase: UserSupabaseClient = Depends(get_user_supabase)
 ):
     """Update a workout"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("workouts").update(workout_update.model_dump(exclude_unset=True)).eq("id", workout_id).eq("user_id", current_user["user"].id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Workout not found")
     
+    schedule_cache.invalidate(str(current_user["user"].id))
+    
     return result.data[0]
 
 @router.delete("/{workout_id}")
-async def delete_workout(workout_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_workout(workout_id: str, current_user: dict = Depends(get_current_user), supabase: UserSupabaseClient = Depends(get_user_supabase)):
     """Delete a workout"""
-    supabase = get_supabase_user_client(current_user["token"])
-    
     result = supabase.table("workouts").delete().eq("id", workout_id).eq("user_id", current_user["user"].id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Workout not found")
     
+    schedule_cache.invalidate(str(current_user["user"].id))
+    
     return {"message": "Workout deleted successfully"}
@@ -1,74 +1,30 @@
-from openai import OpenAI
-from backend.config import settings
-from backend.database import get_supabase_user_client
-from typing import List, Dict, Any
+from backend.services.llm_client import complete_json, stream_json
+from backend.services.user_context import UserContext, load_user_context
+from backend.services.nutrition import calculate_targets, check_meal, plan_totals
+from backend.services.catalog import RECIPE, catalog, preference_filters
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from datetime import datetime
+import asyncio
 import json
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-async def generate_meal(user_id: str, token: str, meal_type: str, preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+def build_meal_messages(meal_type: str, preferences: Optional[Dict[str, Any]], user_context: UserContext) -> List[Dict[str, str]]:
     """
-    Generate a personalized meal using GPT based on user profile, goals, and dietary restrictions
+    Build the prompt for a personalized meal from the user's profile, goals, and dietary restrictions
     """
-    supabase = get_supabase_user_client(token)
-    
-    # Fetch user profile
-    profile_result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    profile = profile_result.data
-    
-    # Fetch user goals
-    goals_result = supabase.table("user_goals").select("*").eq("user_id", user_id).execute()
-    goals = goals_result.data
-    
-    # Fetch dietary preferences and restrictions
-    diet_result = supabase.table("dietary_preferences").select("*").eq("user_id", user_id).execute()
-    dietary_prefs = diet_result.data
-    
-    # Fetch recent meals for variety
-    recent_meals = supabase.table("meals").select("title, meal_type").eq("user_id", user_id).order("scheduled_date", desc=True).limit(7).execute()
-    
-    # Calculate nutritional needs based on profile and goals
+    profile = user_context.profile
     weight_kg = profile.get('weight_kg', 70)
     activity_level = profile.get('activity_level', 'moderate')
+    goal_types = user_context.goal_types
     
-    # Basic calorie calculation (can be refined)
-    activity_multipliers = {
-        'sedentary': 1.2,
-        'light': 1.375,
-        'moderate': 1.55,
-        'active': 1.725,
-        'very_active': 1.9
-    }
-    
-    bmr = 10 * weight_kg + 6.25 * profile.get('height_cm', 170) - 5 * profile.get('age', 30)
-    if profile.get('gender') == 'female':
-        bmr -= 161
-    else:
-        bmr += 5
-    
-    daily_calories = bmr * activity_multipliers.get(activity_level, 1.55)
-    
-    # Adjust based on goals
-    goal_types = [g['goal_type'] for g in goals]
-    if 'Lose Weight' in goal_types:
-        daily_calories *= 0.85  # 15% deficit
-    elif 'Build Muscle' in goal_types:
-        daily_calories *= 1.1  # 10% surplus
-    
-    # Meal calorie distribution
-    meal_percentages = {
-        'breakfast': 0.25,
-        'lunch': 0.35,
-        'dinner': 0.30,
-        'snack': 0.10
-    }
-    
-    target_calories = int(daily_calories * meal_percentages.get(meal_type, 0.30))
+    # Calculate nutritional needs based on profile and goals
+    targets = calculate_targets(profile, goal_types)
+    daily_calories = targets.daily_calories
+    target_calories = targets.meal_calories(meal_type)
     
     # Build context for AI
-    restrictions = [d['value'] for d in dietary_prefs if d['preference_type'] == 'restriction']
-    allergies = [d['value'] for d in dietary_prefs if d['preference_type'] == 'allergy']
-    preferences_list = [d['value'] for d in dietary_prefs if d['preference_type'] == 'preference']
+    restrictions = user_context.preference_values('restriction')
+    allergies = user_context.preference_values('allergy')
+    preferences_list = user_context.preference_values('preference')
     
     context = f"""
     User Profile:
@@ -88,127 +44,201 @@ async def generate_meal(user_id: str, token: str, meal_type: str, preferences: D
     Target Calories for this meal: {target_calories} kcal
     
     Recent Meals (for variety):
-    {json.dumps([{'title': m['title'], 'type': m['meal_type']} for m in recent_meals.data], indent=2)}
+    {json.dumps([{'title': m['title'], 'type': m['meal_type']} for m in user_context.recent_meals], indent=2)}
     
     Additional Preferences:
     {json.dumps(preferences or {}, indent=2)}
     """
     
-    # Generate meal using OpenAI
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": """You are an expert nutritionist and meal planner. Generate personalized, nutritious, and delicious meals based on user profiles, goals, and dietary restrictions.
-                
-                Return a JSON object with the following structure:
-                {
-                    "title": "Meal name",
-                    "description": "Brief appetizing description",
-                    "meal_type": "breakfast|lunch|dinner|snack",
-                    "calories": total calories,
-                    "protein_g": protein in grams,
-                    "carbs_g": carbohydrates in grams,
-                    "fat_g": fat in grams,
-                    "fiber_g": fiber in grams,
-                    "ingredients": [
-                        {
-                            "name": "Ingredient name",
-                            "amount": "quantity",
-                            "unit": "g|ml|cup|tbsp|etc",
-                            "calories": calories from this ingredient
-                        }
-                    ],
-                    "instructions": [
-                        "Step 1",
-                        "Step 2",
-                        "..."
-                    ],
-                    "prep_time_minutes": preparation time,
-                    "cook_time_minutes": cooking time,
-                    "servings": number of servings,
-                    "tags": ["quick", "high-protein", "vegetarian", etc],
-                    "tips": "Cooking tips and variations",
-                    "nutrition_notes": "Why this meal supports their goals"
-                }
-                
-                Consider:
-                - User's dietary restrictions and allergies (MUST comply)
-                - Nutritional goals and calorie targets
-                - Variety from recent meals
-                - Balanced macronutrients
-                - Practical and achievable recipes
-                - Seasonal and accessible ingredients
-                """
-            },
+    return [
+        {
+            "role": "system",
+            "content": """You are an expert nutritionist and meal planner. Generate personalized, nutritious, and delicious meals based on user profiles, goals, and dietary restrictions.
+            
+            Return a JSON object with the following structure:
             {
-                "role": "user",
-                "content": f"Generate a personalized {meal_type} for this user:\n\n{context}"
+                "title": "Meal name",
+                "description": "Brief appetizing description",
+                "meal_type": "breakfast|lunch|dinner|snack",
+                "calories": total calories,
+                "protein_g": protein in grams,
+                "carbs_g": carbohydrates in grams,
+                "fat_g": fat in grams,
+                "fiber_g": fiber in grams,
+                "ingredients": [
+                    {
+                        "name": "Ingredient name",
+                        "amount": "quantity",
+                        "unit": "g|ml|cup|tbsp|etc",
+                        "calories": calories from this ingredient
+                    }
+                ],
+                "instructions": [
+                    "Step 1",
+                    "Step 2",
+                    "..."
+                ],
+                "prep_time_minutes": preparation time,
+                "cook_time_minutes": cooking time,
+                "servings": number of servings,
+                "tags": ["quick", "high-protein", "vegetarian", etc],
+                "tips": "Cooking tips and variations",
+                "nutrition_notes": "Why this meal supports their goals"
             }
-        ],
-        response_format={"type": "json_object"},
+            
+            Consider:
+            - User's dietary restrictions and allergies (MUST comply)
+            - Nutritional goals and calorie targets
+            - Variety from recent meals
+            - Balanced macronutrients
+            - Practical and achievable recipes
+            - Seasonal and accessible ingredients
+            """
+        },
+        {
+            "role": "user",
+            "content": f"Generate a personalized {meal_type} for this user:\n\n{context}"
+        }
+    ]
+
+async def generate_meal(user_id: str, token: str, meal_type: str, preferences: Dict[str, Any] = None, user_context: Optional[UserContext] = None) -> Dict[str, Any]:
+    """
+    Generate a personalized meal using GPT based on user profile, goals, and dietary restrictions
+    """
+    # Profile, goals, dietary preferences and recent meals for variety
+    user_context = user_context or await load_user_context(user_id, token)
+    
+    # Generate meal using OpenAI
+    meal_data = await complete_json(
+        messages=build_meal_messages(meal_type, preferences, user_context),
         temperature=0.8
     )
     
-    meal_data = json.loads(response.choices[0].message.content)
+    # Replace the model's macro estimates with ingredient-level values and fit the calorie target
+    return check_meal(meal_data, calculate_targets(user_context.profile, user_context.goal_types).meal_calories(meal_type))
+
+async def stream_meal(user_id: str, token: str, meal_type: str, preferences: Dict[str, Any] = None, user_context: Optional[UserContext] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate a meal like generate_meal, yielding model tokens as they arrive and the parsed meal last
+    """
+    yield {"event": "started"}
+    
+    user_context = user_context or await load_user_context(user_id, token)
+    
+    content = []
+    async for delta in stream_json(messages=build_meal_messages(meal_type, preferences, user_context), temperature=0.8):
+        content.append(delta)
+        yield {"event": "token", "delta": delta}
+    
+    meal_data = check_meal(json.loads("".join(content)), calculate_targets(user_context.profile, user_context.goal_types).meal_calories(meal_type))
+    
+    yield {"event": "meal", "meal": meal_data}
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+# Cuisines handed out to the meals of one day so concurrent generations don't converge on the same dish
+CUISINE_ROTATION = [
+    "Mediterranean", "Mexican", "Japanese", "Indian", "Middle Eastern",
+    "Italian", "Thai", "Greek", "Korean", "American"
+]
+
+def _variety_preferences(date: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Assign each meal of the day a distinct cuisine and tell it what the other meals are
+    """
+    offset = datetime.fromisoformat(date).toordinal() % len(CUISINE_ROTATION)
+    cuisines = {
+        meal_type: CUISINE_ROTATION[(offset + i) % len(CUISINE_ROTATION)]
+        for i, meal_type in enumerate(MEAL_TYPES)
+    }
+    
+    preferences = {}
+    for meal_type in MEAL_TYPES:
+        others = [f"{t} ({cuisines[t]})" for t in MEAL_TYPES if t != meal_type]
+        preferences[meal_type] = {
+            "cuisine": cuisines[meal_type],
+            "variety_constraint": f"This meal is planned for the same day as {', '.join(others)}. Use a different main protein and main ingredients than a typical dish of those meals."
+        }
+    
+    return preferences
+
+def calculate_daily_totals(meals: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Sum the macros of a day's meals
+    """
+    return plan_totals([meals])[0]
+
+async def iter_daily_meals(user_id: str, token: str, date: str, user_context: UserContext) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Generate the four meals of a day concurrently, yielding each (meal_type, meal) as soon as it is ready
     
-    return meal_data
+    Every meal gets its own cuisine and a variety constraint; a meal whose title duplicates
+    one already yielded is regenerated before it is yielded.
+    """
+    variety = _variety_preferences(date)
+    
+    async def generate(meal_type: str) -> Tuple[str, Dict[str, Any]]:
+        return meal_type, await generate_meal(user_id, token, meal_type, preferences=variety[meal_type], user_context=user_context)
+    
+    pending = [asyncio.create_task(generate(meal_type)) for meal_type in MEAL_TYPES]
+    seen_titles = []
+    
+    try:
+        for next_meal in asyncio.as_completed(pending):
+            meal_type, meal_data = await next_meal
+            if (meal_data.get('title') or '').strip().lower() in [t.lower() for t in seen_titles]:
+                meal_data = await generate_meal(user_id, token, meal_type, preferences={
+                    **variety[meal_type],
+                    "avoid_meals": seen_titles
+                }, user_context=user_context)
+            seen_titles.append((meal_data.get('title') or '').strip())
+            yield meal_type, meal_data
+    finally:
+        for task in pending:
+            task.cancel()
 
-async def generate_daily_meal_plan(user_id: str, token: str, date: str) -> Dict[str, Any]:
+async def generate_daily_meal_plan(user_id: str, token: str, date: str, concurrent: bool = True, user_context: Optional[UserContext] = None) -> Dict[str, Any]:
     """
     Generate a complete daily meal plan with all meals
+    
+    In concurrent mode the four meals are generated together under a variety constraint,
+    otherwise they are generated one after another.
     """
+    user_context = user_context or await load_user_context(user_id, token)
     meals = {}
     
-    for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-        meal_data = await generate_meal(user_id, token, meal_type)
-        meals[meal_type] = meal_data
-    
-    # Calculate daily totals
-    total_calories = sum(m['calories'] for m in meals.values())
-    total_protein = sum(m['protein_g'] for m in meals.values())
-    total_carbs = sum(m['carbs_g'] for m in meals.values())
-    total_fat = sum(m['fat_g'] for m in meals.values())
+    if concurrent:
+        generated = {meal_type: meal_data async for meal_type, meal_data in iter_daily_meals(user_id, token, date, user_context)}
+        meals = {meal_type: generated[meal_type] for meal_type in MEAL_TYPES}
+    else:
+        for meal_type in MEAL_TYPES:
+            preferences = {"avoid_meals": [m['title'] for m in meals.values()]} if meals else None
+            meal_data = await generate_meal(user_id, token, meal_type, preferences=preferences, user_context=user_context)
+            meals[meal_type] = meal_data
     
     return {
         "date": date,
         "meals": meals,
-        "daily_totals": {
-            "calories": total_calories,
-            "protein_g": total_protein,
-            "carbs_g": total_carbs,
-            "fat_g": total_fat
-        }
+        "daily_totals": calculate_daily_totals(meals)
     }
 
-async def generate_weekly_meal_plan(user_id: str, token: str) -> List[Dict[str, Any]]:
+async def generate_weekly_meal_plan(user_id: str, token: str, user_context: Optional[UserContext] = None) -> List[Dict[str, Any]]:
     """
     Generate a complete weekly meal plan
     """
-    supabase = get_supabase_user_client(token)
+    # Fetch user profile, goals and restrictions
+    user_context = user_context or await load_user_context(user_id, token)
     
-    # Fetch user profile and goals
-    profile_result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    profile = profile_result.data
-    
-    goals_result = supabase.table("user_goals").select("*").eq("user_id", user_id).execute()
-    goals = goals_result.data
-    
-    diet_result = supabase.table("dietary_preferences").select("*").eq("user_id", user_id).execute()
-    dietary_prefs = diet_result.data
-    
-    restrictions = [d['value'] for d in dietary_prefs if d['preference_type'] == 'restriction']
+    restrictions = user_context.preference_values('restriction')
     
     context = f"""
     User Profile:
-    - Goals: {', '.join([g['goal_type'] for g in goals])}
+    - Goals: {', '.join(user_context.goal_types)}
     - Dietary Restrictions: {', '.join(restrictions) if restrictions else 'None'}
-    - Activity Level: {profile.get('activity_level', 'moderate')}
+    - Activity Level: {user_context.profile.get('activity_level', 'moderate')}
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    plan_data = await complete_json(
         messages=[
             {
                 "role": "system",
@@ -250,25 +280,30 @@ async def generate_weekly_meal_plan(user_id: str, token: str) -> List[Dict[str,
                 "content": f"Generate a weekly meal plan:\n\n{context}"
             }
         ],
-        response_format={"type": "json_object"},
         temperature=0.8
     )
     
-    plan_data = json.loads(response.choices[0].message.content)
-    
     return plan_data
 
-async def get_recipe_suggestions(user_id: str, token: str, cuisine: str = None, max_time: int = None) -> List[Dict[str, Any]]:
+async def get_recipe_suggestions(user_id: str, token: str, cuisine: str = None, max_time: int = None, user_context: Optional[UserContext] = None) -> List[Dict[str, Any]]:
     """
     Get recipe suggestions based on criteria
-    """
-    supabase = get_supabase_user_client(token)
     
+    Served from the local catalog when it has enough matching recipes; otherwise generated
+    and added to the catalog.
+    """
     # Fetch dietary restrictions
-    diet_result = supabase.table("dietary_preferences").select("*").eq("user_id", user_id).execute()
-    dietary_prefs = diet_result.data
+    user_context = user_context or await load_user_context(user_id, token)
+    
+    # Sorted so the same restrictions always produce the same prompt (and cache entry)
+    restrictions = sorted(user_context.preference_values('restriction', 'allergy'), key=str.lower)
     
-    restrictions = [d['value'] for d in dietary_prefs if d['preference_type'] in ['restriction', 'allergy']]
+    required_tags, excluded_allergens = preference_filters(restrictions)
+    required = {"cuisine": [cuisine] if cuisine else [], "tag": required_tags}
+    
+    recipes = await catalog.lookup(RECIPE, required, {"allergen": excluded_allergens}, max_minutes=max_time)
+    if recipes is not None:
+        return recipes
     
     query = f"Suggest recipes"
     if cuisine:
@@ -278,8 +313,7 @@ async def get_recipe_suggestions(user_id: str, token: str, cuisine: str = None,
     if restrictions:
         query += f" that are {', '.join(restrictions)}"
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    suggestions = await complete_json(
         messages=[
             {
                 "role": "system",
@@ -298,7 +332,8 @@ async def get_recipe_suggestions(user_id: str, token: str, cuisine: str = None,
                             "calories_per_serving": calories,
                             "description": "Brief description",
                             "key_ingredients": ["ingredient1", "ingredient2"],
-                            "tags": ["quick", "healthy", etc]
+                            "allergens": ["dairy", "gluten", "egg", "peanut", "tree nut", "soy", "fish", "shellfish", "sesame" - only those present],
+                            "tags": ["quick", "healthy", "vegetarian", etc - include every dietary label the recipe meets]
                         }
                     ]
                 }
@@ -309,10 +344,11 @@ async def get_recipe_suggestions(user_id: str, token: str, cuisine: str = None,
                 "content": query
             }
         ],
-        response_format={"type": "json_object"},
-        temperature=0.8
+        temperature=0.8,
+        cache_endpoint="recipe_suggestions"
     )
     
-    suggestions = json.loads(response.choices[0].message.content)
+    # The recipes were asked for with these constraints, so index them under them too
+    await catalog.add(RECIPE, suggestions["recipes"], implied=required)
     
     return suggestions["recipes"]
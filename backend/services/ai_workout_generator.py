@@ -1,31 +1,14 @@
-from openai import OpenAI
-from backend.config import settings
-from backend.database import get_supabase_user_client
-from typing import List, Dict, Any
+from backend.services.llm_client import complete_json, stream_json
+from backend.services.user_context import UserContext, load_user_context
+from backend.services.catalog import EXERCISE, catalog
+from typing import AsyncIterator, List, Dict, Any, Optional
 import json
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-async def generate_workout(user_id: str, token: str, preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+def build_workout_messages(preferences: Optional[Dict[str, Any]], user_context: UserContext) -> List[Dict[str, str]]:
     """
-    Generate a personalized workout using GPT-5 based on user profile and goals
+    Build the chat messages for a personalized workout from the user's profile and goals
     """
-    supabase = get_supabase_user_client(token)
-    
-    # Fetch user profile
-    profile_result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    profile = profile_result.data
-    
-    # Fetch user goals
-    goals_result = supabase.table("user_goals").select("*").eq("user_id", user_id).execute()
-    goals = goals_result.data
-    
-    # Fetch dietary preferences for context
-    diet_result = supabase.table("dietary_preferences").select("*").eq("user_id", user_id).execute()
-    dietary_prefs = diet_result.data
-    
-    # Fetch recent workouts for variety
-    recent_workouts = supabase.table("workouts").select("title, workout_type").eq("user_id", user_id).order("scheduled_date", desc=True).limit(5).execute()
+    profile = user_context.profile
     
     # Build context for AI
     context = f"""
@@ -37,91 +20,105 @@ async def generate_workout(user_id: str, token: str, preferences: Dict[str, Any]
     - Activity Level: {profile.get('activity_level', 'moderate')}
     
     Goals:
-    {json.dumps([{'type': g['goal_type'], 'target': g.get('target_value'), 'unit': g.get('unit')} for g in goals], indent=2)}
+    {json.dumps([{'type': g['goal_type'], 'target': g.get('target_value'), 'unit': g.get('unit')} for g in user_context.goals], indent=2)}
     
     Recent Workouts (for variety):
-    {json.dumps([{'title': w['title'], 'type': w['workout_type']} for w in recent_workouts.data], indent=2)}
+    {json.dumps([{'title': w['title'], 'type': w['workout_type']} for w in user_context.recent_workouts], indent=2)}
     
     Additional Preferences:
     {json.dumps(preferences or {}, indent=2)}
     """
     
-    # Generate workout using OpenAI
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": """You are an expert fitness trainer and workout planner. Generate personalized, safe, and effective workouts based on user profiles and goals. 
-                
-                Return a JSON object with the following structure:
-                {
-                    "title": "Workout title",
-                    "description": "Brief description",
-                    "workout_type": "cardio|strength|flexibility|sports",
-                    "duration_minutes": 30-90,
-                    "intensity": "low|medium|high",
-                    "calories_burned": estimated calories,
-                    "exercises": [
-                        {
-                            "name": "Exercise name",
-                            "sets": 3,
-                            "reps": "10-12" or "duration in seconds",
-                            "rest_seconds": 60,
-                            "instructions": "How to perform",
-                            "tips": "Safety tips and form cues"
-                        }
-                    ],
-                    "warmup": "Warmup routine description",
-                    "cooldown": "Cooldown routine description",
-                    "notes": "Additional notes or modifications"
-                }
-                
-                Consider:
-                - User's fitness level and goals
-                - Variety from recent workouts
-                - Safety and proper progression
-                - Equipment availability (assume basic home equipment)
-                - Time efficiency
-                """
-            },
+    return [
+        {
+            "role": "system",
+            "content": """You are an expert fitness trainer and workout planner. Generate personalized, safe, and effective workouts based on user profiles and goals. 
+            
+            Return a JSON object with the following structure:
             {
-                "role": "user",
-                "content": f"Generate a personalized workout for this user:\n\n{context}"
+                "title": "Workout title",
+                "description": "Brief description",
+                "workout_type": "cardio|strength|flexibility|sports",
+                "duration_minutes": 30-90,
+                "intensity": "low|medium|high",
+                "calories_burned": estimated calories,
+                "exercises": [
+                    {
+                        "name": "Exercise name",
+                        "sets": 3,
+                        "reps": "10-12" or "duration in seconds",
+                        "rest_seconds": 60,
+                        "instructions": "How to perform",
+                        "tips": "Safety tips and form cues"
+                    }
+                ],
+                "warmup": "Warmup routine description",
+                "cooldown": "Cooldown routine description",
+                "notes": "Additional notes or modifications"
             }
-        ],
-        response_format={"type": "json_object"},
+            
+            Consider:
+            - User's fitness level and goals
+            - Variety from recent workouts
+            - Safety and proper progression
+            - Equipment availability (assume basic home equipment)
+            - Time efficiency
+            """
+        },
+        {
+            "role": "user",
+            "content": f"Generate a personalized workout for this user:\n\n{context}"
+        }
+    ]
+
+async def generate_workout(user_id: str, token: str, preferences: Dict[str, Any] = None, user_context: Optional[UserContext] = None) -> Dict[str, Any]:
+    """
+    Generate a personalized workout using GPT-5 based on user profile and goals
+    """
+    # Profile, goals and recent workouts for variety
+    user_context = user_context or await load_user_context(user_id, token)
+    
+    # Generate workout using OpenAI
+    workout_data = await complete_json(
+        messages=build_workout_messages(preferences, user_context),
         temperature=0.7
     )
     
-    workout_data = json.loads(response.choices[0].message.content)
-    
     return workout_data
 
-async def generate_weekly_workout_plan(user_id: str, token: str, days_per_week: int = 4) -> List[Dict[str, Any]]:
+async def stream_workout(user_id: str, token: str, preferences: Dict[str, Any] = None, user_context: Optional[UserContext] = None) -> AsyncIterator[Dict[str, Any]]:
     """
-    Generate a complete weekly workout plan
+    Generate a workout like generate_workout, yielding model tokens as they arrive and the parsed workout last
     """
-    supabase = get_supabase_user_client(token)
+    yield {"event": "started"}
     
-    # Fetch user profile and goals
-    profile_result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    profile = profile_result.data
+    user_context = user_context or await load_user_context(user_id, token)
     
-    goals_result = supabase.table("user_goals").select("*").eq("user_id", user_id).execute()
-    goals = goals_result.data
+    content = []
+    async for delta in stream_json(messages=build_workout_messages(preferences, user_context), temperature=0.7):
+        content.append(delta)
+        yield {"event": "token", "delta": delta}
+    
+    yield {"event": "workout", "workout": json.loads("".join(content))}
+
+async def generate_weekly_workout_plan(user_id: str, token: str, days_per_week: int = 4, user_context: Optional[UserContext] = None) -> List[Dict[str, Any]]:
+    """
+    Generate a complete weekly workout plan
+    """
+    # Fetch user profile and goals
+    user_context = user_context or await load_user_context(user_id, token)
+    profile = user_context.profile
     
     context = f"""
     User Profile:
     - Age: {profile.get('age', 'Not specified')}
     - Activity Level: {profile.get('activity_level', 'moderate')}
-    - Goals: {', '.join([g['goal_type'] for g in goals])}
+    - Goals: {', '.join(user_context.goal_types)}
     
     Days per week: {days_per_week}
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    plan_data = await complete_json(
         messages=[
             {
                 "role": "system",
@@ -155,26 +152,31 @@ async def generate_weekly_workout_plan(user_id: str, token: str, days_per_week:
                 "content": f"Generate a weekly workout plan:\n\n{context}"
             }
         ],
-        response_format={"type": "json_object"},
         temperature=0.7
     )
     
-    plan_data = json.loads(response.choices[0].message.content)
-    
     return plan_data["plan"]
 
 async def get_exercise_recommendations(user_id: str, token: str, muscle_group: str = None, equipment: str = None) -> List[Dict[str, Any]]:
     """
     Get exercise recommendations for specific muscle groups or equipment
+    
+    Served from the local catalog when it has enough matching exercises; otherwise generated
+    and added to the catalog.
     """
+    required = {"muscle_group": [muscle_group] if muscle_group else [], "equipment": [equipment] if equipment else []}
+    
+    exercises = await catalog.lookup(EXERCISE, required)
+    if exercises is not None:
+        return exercises
+    
     query = f"Recommend exercises"
     if muscle_group:
         query += f" for {muscle_group}"
     if equipment:
         query += f" using {equipment}"
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    recommendations = await complete_json(
         messages=[
             {
                 "role": "system",
@@ -201,10 +203,10 @@ async def get_exercise_recommendations(user_id: str, token: str, muscle_group: s
                 "content": query
             }
         ],
-        response_format={"type": "json_object"},
-        temperature=0.7
+        temperature=0.7,
+        cache_endpoint="exercise_recommendations"
     )
     
-    recommendations = json.loads(response.choices[0].message.content)
+    await catalog.add(EXERCISE, recommendations["exercises"], implied=required)
     
     return recommendations["exercises"]
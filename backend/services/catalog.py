@@ -0,0 +1,271 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from backend.config import settings
+from backend.services.generation_cache import normalize_text
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+RECIPE = "recipe"
+EXERCISE = "exercise"
+
+# Allergen -> ingredient words that imply it; also used to read allergy and "-free" preferences
+ALLERGEN_KEYWORDS = {
+    "dairy": ["dairy", "milk", "cheese", "yogurt", "yoghurt", "butter", "cream", "whey", "lactose", "ghee", "feta", "parmesan", "mozzarella"],
+    "gluten": ["gluten", "wheat", "flour", "bread", "pasta", "barley", "rye", "couscous", "noodle", "tortilla", "seitan", "soy sauce", "sourdough", "cornbread"],
+    "egg": ["egg"],
+    "peanut": ["peanut"],
+    "tree nut": ["tree nut", "nut", "almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "macadamia"],
+    "soy": ["soy", "tofu", "tempeh", "edamame", "miso"],
+    "fish": ["fish", "salmon", "tuna", "cod", "tilapia", "anchovy", "anchovies", "sardine", "trout"],
+    "shellfish": ["shellfish", "shrimp", "prawn", "crab", "lobster", "clam", "mussel", "scallop", "oyster"],
+    "sesame": ["sesame", "tahini"]
+}
+
+# Keywords match at the start of a word so compounds and plurals count ("buttermilk", "breadcrumbs", "eggs")
+_ALLERGEN_PATTERNS = {
+    allergen: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")")
+    for allergen, words in ALLERGEN_KEYWORDS.items()
+}
+
+# Words starting with an allergen keyword that don't contain it
+_NOT_ALLERGENS = re.compile(r"\b(?:butternut|nutmeg|nutri|eggplant|cream of tartar)\w*")
+
+BODYWEIGHT_TERMS = {"none", "no equipment", "bodyweight", "body weight", "body-weight"}
+
+def normalize_term(term: Any) -> str:
+    """Lowercase, collapse whitespace and drop a plural "s" so index terms and queries line up"""
+    term = normalize_text(str(term))
+    if term in BODYWEIGHT_TERMS:
+        return "bodyweight"
+    return term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term
+
+def detect_allergens(*texts: Any) -> List[str]:
+    text = " ".join(str(t) for t in texts if t).lower()
+    # Plant milks and nut butters aren't dairy; the word before still names their allergen
+    text = re.sub(r"\b(peanut|almond|cashew|nut|cocoa|apple|shea)\s+butter", r"\1", text)
+    text = re.sub(r"\b(coconut|almond|oat|soy|rice|cashew)\s+milk", r"\1", text)
+    text = _NOT_ALLERGENS.sub("", text)
+    return [allergen for allergen, pattern in _ALLERGEN_PATTERNS.items() if pattern.search(text)]
+
+def preference_filters(values: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split dietary restrictions and allergies into tags a recipe must carry and allergens it must not contain
+    
+    "Peanut allergy" or "gluten-free" exclude an allergen; anything else ("vegan", "halal") is a required tag.
+    """
+    tags, allergens = [], []
+    
+    for value in values:
+        found = detect_allergens(value)
+        if found:
+            allergens.extend(found)
+        else:
+            tags.append(normalize_term(value))
+    
+    return sorted(set(tags)), sorted(set(allergens))
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [part for part in re.split(r",|/|;|\bor\b|\band\b", value) if part.strip()]
+    return [str(v) for v in value]
+
+def _minutes(*values: Any) -> Optional[int]:
+    numbers = [int(match.group()) for value in values if value is not None for match in [re.search(r"\d+", str(value))] if match]
+    return sum(numbers) if numbers else None
+
+def item_terms(kind: str, item: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Facet terms an item is indexed under"""
+    if kind == RECIPE:
+        return {
+            "cuisine": _as_list(item.get("cuisine")),
+            "tag": _as_list(item.get("tags")),
+            "difficulty": _as_list(item.get("difficulty")),
+            "allergen": detect_allergens(" ".join(_as_list(item.get("allergens"))), item.get("title"), *item.get("key_ingredients") or [])
+        }
+    return {
+        "muscle_group": _as_list(item.get("muscle_groups")),
+        "equipment": _as_list(item.get("equipment")),
+        "difficulty": _as_list(item.get("difficulty"))
+    }
+
+def _item_name(item: Dict[str, Any]) -> str:
+    return normalize_text(str(item.get("title") or item.get("name") or ""))
+
+class SQLiteCatalog:
+    """
+    Recipes and exercises kept on disk with an inverted index from facet terms to items
+    
+    Each (kind, facet, term) maps to the items carrying it, so a filtered lookup is a handful of
+    index probes; prep time is a plain indexed column used for range filters.
+    """
+    
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_items (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                total_minutes INTEGER,
+                created_at REAL NOT NULL,
+                UNIQUE (kind, name)
+            );
+            CREATE INDEX IF NOT EXISTS catalog_items_minutes_idx ON catalog_items(kind, total_minutes);
+            CREATE TABLE IF NOT EXISTS catalog_terms (
+                kind TEXT NOT NULL,
+                facet TEXT NOT NULL,
+                term TEXT NOT NULL,
+                item_id INTEGER NOT NULL REFERENCES catalog_items(id),
+                PRIMARY KEY (kind, facet, term, item_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS catalog_terms_item_idx ON catalog_terms(item_id, facet);
+            """
+        )
+        self._conn.commit()
+    
+    def search(
+        self,
+        kind: str,
+        required: Dict[str, List[str]],
+        excluded: Dict[str, List[str]],
+        max_minutes: Optional[int],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        clauses = ["i.kind = ?"]
+        params: List[Any] = [kind]
+        
+        for facet, terms in required.items():
+            for term in terms:
+                clauses.append("i.id IN (SELECT item_id FROM catalog_terms WHERE kind = ? AND facet = ? AND term = ?)")
+                params.extend([kind, facet, normalize_term(term)])
+        
+        for facet, terms in excluded.items():
+            if terms:
+                clauses.append(f"NOT EXISTS (SELECT 1 FROM catalog_terms t WHERE t.item_id = i.id AND t.facet = ? AND t.term IN ({', '.join('?' * len(terms))}))")
+                params.extend([facet, *[normalize_term(term) for term in terms]])
+        
+        if max_minutes:
+            clauses.append("i.total_minutes <= ?")
+            params.append(max_minutes)
+        
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT i.data FROM catalog_items i WHERE {' AND '.join(clauses)} ORDER BY random() LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        
+        return [json.loads(row[0]) for row in rows]
+    
+    def add(self, kind: str, items: List[Dict[str, Any]], implied: Dict[str, List[str]]) -> None:
+        now = time.time()
+        
+        with self._lock:
+            for item in items:
+                name = _item_name(item)
+                if not name:
+                    continue
+                
+                minutes = _minutes(item.get("prep_time"), item.get("cook_time")) if kind == RECIPE else None
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO catalog_items (kind, name, data, total_minutes, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, name, json.dumps(item), minutes, now)
+                )
+                item_id = self._conn.execute("SELECT id FROM catalog_items WHERE kind = ? AND name = ?", (kind, name)).fetchone()[0]
+                
+                terms = item_terms(kind, item)
+                for facet, values in implied.items():
+                    terms[facet] = [*terms.get(facet, []), *values]
+                
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO catalog_terms (kind, facet, term, item_id) VALUES (?, ?, ?, ?)",
+                    [(kind, facet, normalize_term(term), item_id) for facet, values in terms.items() for term in values if str(term).strip()]
+                )
+            
+            self._conn.commit()
+    
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT kind, COUNT(*) FROM catalog_items GROUP BY kind").fetchall())
+
+class Catalog:
+    """
+    Local catalog consulted before asking the LLM for recipes or exercises
+    
+    A lookup with at least CATALOG_MIN_MATCHES matches is answered from the catalog;
+    otherwise the caller generates and adds the results so the next lookup is served locally.
+    """
+    
+    def __init__(self, min_matches: int, max_results: int):
+        self.min_matches = min_matches
+        self.max_results = max_results
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+    
+    async def lookup(
+        self,
+        kind: str,
+        required: Dict[str, List[str]],
+        excluded: Optional[Dict[str, List[str]]] = None,
+        max_minutes: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Matching items, or None when there are too few to skip the LLM"""
+        store = get_catalog_store()
+        if store is None:
+            return None
+        
+        matches = await asyncio.to_thread(store.search, kind, required, excluded or {}, max_minutes, self.max_results)
+        
+        if len(matches) < self.min_matches:
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+            return None
+        
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+        return matches
+    
+    async def add(self, kind: str, items: List[Dict[str, Any]], implied: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Store generated items; `implied` are the terms they were requested with and are indexed too
+        """
+        store = get_catalog_store()
+        if store is not None:
+            await asyncio.to_thread(store.add, kind, items, implied or {})
+    
+    async def load_seed(self, path: str) -> None:
+        """Import curated {"recipes": [...], "exercises": [...]} from a JSON file"""
+        with open(path) as f:
+            seed = json.load(f)
+        
+        await self.add(RECIPE, seed.get("recipes", []))
+        await self.add(EXERCISE, seed.get("exercises", []))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": settings.CATALOG_BACKEND,
+            "items": _store.counts() if _store is not None else {},
+            "hits": self.hits,
+            "llm_fallbacks": self.misses
+        }
+
+_store: Optional[SQLiteCatalog] = None
+
+def get_catalog_store() -> Optional[SQLiteCatalog]:
+    """
+    Return the catalog database at CATALOG_PATH, opening it on first use
+    """
+    global _store
+    
+    if _store is None and settings.CATALOG_BACKEND == "sqlite":
+        _store = SQLiteCatalog(settings.CATALOG_PATH)
+    
+    return _store
+
+catalog = Catalog(settings.CATALOG_MIN_MATCHES, settings.CATALOG_MAX_RESULTS)
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from backend.config import settings
+from typing import Any, Dict, List, Optional, Tuple
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase and collapse whitespace so equivalent prompts share a fingerprint
+    """
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def prompt_fingerprint(model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+    """
+    Stable hash of a completion request built from its model, prompts and temperature
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [{"role": m["role"], "content": normalize_text(m["content"])} for m in messages]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class MemoryCacheBackend:
+    """
+    In-process LRU with per-entry expiry
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # Values are kept serialized so callers can't mutate cached results
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            return None
+        
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return json.loads(entry[1])
+    
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: int) -> None:
+        self._entries[key] = (time.time() + ttl_seconds, json.dumps(value))
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def size(self) -> int:
+        return len(self._entries)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache shared by every worker on the host, evicting least recently used rows
+    """
+    
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS generation_cache_accessed_idx ON generation_cache(accessed_at)")
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM generation_cache WHERE key = ?", (key,)).fetchone()
+            
+            if row is None:
+                return None
+            
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            
+            self._conn.execute("UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: int) -> None:
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl_seconds, now)
+            )
+            # Drop expired rows, then the least recently used ones beyond the size limit
+            self._conn.execute("DELETE FROM generation_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM generation_cache WHERE key IN (
+                    SELECT key FROM generation_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+    
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM generation_cache")
+            self._conn.commit()
+
+class GenerationCache:
+    """
+    Cache of AI completions for the endpoints that opted in, with hit-rate metrics
+    """
+    
+    def __init__(self, backend: Any, ttl_seconds: int, endpoints: List[str]):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.endpoints = set(endpoints)
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+    
+    def enabled_for(self, endpoint: Optional[str]) -> bool:
+        return self.backend is not None and endpoint in self.endpoints
+    
+    async def get(self, endpoint: str, key: str) -> Optional[Dict[str, Any]]:
+        # The SQLite backend does disk I/O and commits on every lookup, so keep it off the event loop
+        value = await asyncio.to_thread(self.backend.get, key)
+        
+        if value is None:
+            self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+        else:
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+        
+        return value
+    
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.backend.set, key, value, self.ttl_seconds)
+    
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        
+        for endpoint in sorted(self.endpoints):
+            hits = self.hits.get(endpoint, 0)
+            misses = self.misses.get(endpoint, 0)
+            endpoints[endpoint] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0
+            }
+        
+        return {
+            "backend": settings.GENERATION_CACHE_BACKEND,
+            "size": self.backend.size() if self.backend is not None else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "endpoints": endpoints
+        }
+
+def _create_backend() -> Any:
+    if settings.GENERATION_CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(settings.GENERATION_CACHE_PATH, settings.GENERATION_CACHE_MAX_ENTRIES)
+    if settings.GENERATION_CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.GENERATION_CACHE_MAX_ENTRIES)
+    return None
+
+generation_cache = GenerationCache(
+    _create_backend(),
+    settings.GENERATION_CACHE_TTL_SECONDS,
+    settings.GENERATION_CACHE_ENDPOINTS
+)
@@ -0,0 +1,49 @@
+from backend.database import UserSupabaseClient
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, timedelta
+
+# Default span and maximum number of buckets per rollup period
+PERIOD_SPANS = {
+    "day": (timedelta(days=30), 366),
+    "week": (timedelta(weeks=12), 260),
+    "month": (timedelta(days=365), 120)
+}
+
+def rollup_range(period: str, start_date: Optional[date], end_date: Optional[date]) -> Tuple[date, date]:
+    """
+    Resolve the date range of a rollup, rejecting ranges with too many buckets
+    """
+    default_span, max_buckets = PERIOD_SPANS[period]
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - default_span
+    
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    
+    days = (end_date - start_date).days + 1
+    buckets = {"day": days, "week": days / 7, "month": days / 30.44}[period]
+    
+    if buckets > max_buckets:
+        raise ValueError(f"Range is too long for {period} rollups (at most {max_buckets} periods)")
+    
+    return start_date, end_date
+
+def fetch_rollup(supabase: UserSupabaseClient, function: str, period: str, start_date: date, end_date: date, **params: Any) -> Dict[str, Any]:
+    """
+    Run a health rollup function in the database and return its buckets with the resolved range
+    """
+    result = supabase.rpc(function, {
+        "p_start": start_date.isoformat(),
+        "p_end": end_date.isoformat(),
+        "p_period": period,
+        **params
+    }).execute()
+    
+    buckets: List[Dict[str, Any]] = result.data or []
+    
+    return {
+        "period": period,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "buckets": buckets
+    }
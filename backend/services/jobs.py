@@ -0,0 +1,307 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from backend.config import settings
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Jobs run by another worker process only reach this one through the store
+FOREIGN_JOB_POLL_SECONDS = 1.0
+
+def instance_id() -> str:
+    """
+    Owner recorded on the jobs this process runs
+    
+    Two live processes on a host never share a pid, so a restarted worker only ever claims
+    jobs orphaned by a dead process that had its pid.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobProgress:
+    """
+    Handed to a running job so it can report which days are done
+    """
+    
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self._queue = queue
+        self._job_id = job_id
+    
+    def set_days(self, days: List[str]) -> None:
+        """Declare the days the job will produce"""
+        job = self._queue.store.get(self._job_id)
+        job["progress"] = {
+            "completed": 0,
+            "total": len(days),
+            "days": {day: "pending" for day in days}
+        }
+        self._queue._save(job)
+    
+    def day_done(self, day: str) -> None:
+        job = self._queue.store.get(self._job_id)
+        progress = job["progress"]
+        
+        if progress["days"].get(day) != "done":
+            progress["days"][day] = "done"
+            progress["completed"] = sum(1 for status in progress["days"].values() if status == "done")
+            self._queue._save(job)
+
+JobRunner = Callable[[JobProgress], Awaitable[Dict[str, Any]]]
+
+class MemoryJobStore:
+    """
+    Jobs kept in process memory; lost on restart
+    """
+    
+    def __init__(self):
+        self._jobs: Dict[str, str] = {}
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return json.loads(job) if job is not None else None
+    
+    def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = json.dumps(job, default=str)
+    
+    def find_active(self, user_id: str, kind: str, dedup_key: str, owner: str) -> Optional[Dict[str, Any]]:
+        for value in self._jobs.values():
+            job = json.loads(value)
+            if (job["user_id"], job["kind"], job["dedup_key"], job.get("owner")) == (user_id, kind, dedup_key, owner) and job["status"] in ACTIVE_STATUSES:
+                return job
+        return None
+    
+    def fail_active(self, owner: str, error: str) -> None:
+        for job in [json.loads(value) for value in self._jobs.values()]:
+            if job.get("owner") == owner and job["status"] in ACTIVE_STATUSES:
+                job.update(status="failed", error=error, updated_at=time.time())
+                self.save(job)
+    
+    def prune(self, finished_before: float) -> None:
+        for job_id, job in [(k, json.loads(v)) for k, v in self._jobs.items()]:
+            if job["status"] in FINISHED_STATUSES and job["updated_at"] < finished_before:
+                del self._jobs[job_id]
+
+class SQLiteJobStore:
+    """
+    Jobs persisted to a local SQLite file so their status survives a restart
+    
+    Several worker processes may share the file; each only dedups against and fails the
+    jobs it owns, since the runners of other processes' jobs live in their memory.
+    """
+    
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                dedup_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+        # Files created before jobs had an owner
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)").fetchall()]
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup_idx ON jobs(user_id, kind, dedup_key, status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner_idx ON jobs(owner, status)")
+        self._conn.commit()
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, user_id, kind, dedup_key, status, data, updated_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["user_id"], job["kind"], job["dedup_key"], job["status"], json.dumps(job, default=str), job["updated_at"], job.get("owner", ""))
+            )
+            self._conn.commit()
+    
+    def find_active(self, user_id: str, kind: str, dedup_key: str, owner: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE user_id = ? AND kind = ? AND dedup_key = ? AND owner = ? AND status IN (?, ?) LIMIT 1",
+                (user_id, kind, dedup_key, owner, *ACTIVE_STATUSES)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def fail_active(self, owner: str, error: str) -> None:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM jobs WHERE owner = ? AND status IN (?, ?)", (owner, *ACTIVE_STATUSES)).fetchall()
+        for row in rows:
+            job = json.loads(row[0])
+            job.update(status="failed", error=error, updated_at=time.time())
+            self.save(job)
+    
+    def prune(self, finished_before: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*FINISHED_STATUSES, finished_before))
+            self._conn.commit()
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers running long generations in the background
+    
+    Submitting returns at once with a job id; status, per-day progress and the result are
+    kept in the store. A job that is still queued or running in this process is reused when
+    the same user submits the same kind of job for the same key again.
+    """
+    
+    def __init__(self, store: Any, workers: int, retention_seconds: int):
+        self.store = store
+        self.owner = instance_id()
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        # Runners hold the user's token, so they are only ever kept in memory
+        self._runners: Dict[str, JobRunner] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self) -> None:
+        # Jobs left active by a previous process with our pid can't be resumed without their runner
+        self.store.fail_active(self.owner, "Interrupted by a server restart")
+        self.store.prune(time.time() - self.retention_seconds)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Queued jobs never reached a worker
+        self.store.fail_active(self.owner, "Cancelled by server shutdown")
+    
+    def submit(self, user_id: str, kind: str, dedup_key: str, runner: JobRunner) -> Dict[str, Any]:
+        existing = self.store.find_active(user_id, kind, dedup_key, self.owner)
+        if existing is not None:
+            return existing
+        
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "kind": kind,
+            "dedup_key": dedup_key,
+            "owner": self.owner,
+            "status": "queued",
+            "progress": {"completed": 0, "total": 0, "days": {}},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.store.save(job)
+        self._runners[job["id"]] = runner
+        self._queue.put_nowait(job["id"])
+        
+        return job
+    
+    def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        return job if job is not None and job["user_id"] == user_id else None
+    
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the job now and after every change until it finishes
+        """
+        job = self.store.get(job_id)
+        
+        if job is not None and job.get("owner") != self.owner:
+            async for job in self._poll(job):
+                yield job
+            return
+        
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(updates)
+        
+        try:
+            # Read again now that changes reach us
+            job = self.store.get(job_id)
+            
+            while True:
+                yield job
+                if job is None or job["status"] in FINISHED_STATUSES:
+                    return
+                job = await updates.get()
+        finally:
+            self._subscribers[job_id].remove(updates)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+    
+    async def _poll(self, job: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Follow a job run by another process through the store"""
+        while True:
+            yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            
+            updated_at = job["updated_at"]
+            while job["updated_at"] == updated_at:
+                await asyncio.sleep(FOREIGN_JOB_POLL_SECONDS)
+                job = self.store.get(job["id"])
+                if job is None:
+                    return
+    
+    def _save(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = time.time()
+        self.store.save(job)
+        
+        for updates in self._subscribers.get(job["id"], []):
+            updates.put_nowait(job)
+    
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            runner = self._runners.pop(job_id, None)
+            job = self.store.get(job_id)
+            
+            if runner is None or job is None:
+                continue
+            
+            job["status"] = "running"
+            self._save(job)
+            
+            try:
+                result = await runner(JobProgress(self, job_id))
+                job = self.store.get(job_id)
+                job.update(status="succeeded", result=result)
+            except asyncio.CancelledError:
+                job = self.store.get(job_id)
+                job.update(status="failed", error="Cancelled by server shutdown")
+                self._save(job)
+                raise
+            except Exception as e:
+                job = self.store.get(job_id)
+                job.update(status="failed", error=str(e))
+            
+            self._save(job)
+            self.store.prune(time.time() - self.retention_seconds)
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job fields returned to clients"""
+    return {key: job[key] for key in ("id", "kind", "status", "progress", "result", "error", "created_at", "updated_at")}
+
+def _create_store() -> Any:
+    if settings.JOB_STORE_BACKEND == "sqlite":
+        return SQLiteJobStore(settings.JOB_STORE_PATH)
+    return MemoryJobStore()
+
+job_queue = JobQueue(_create_store(), settings.JOB_WORKERS, settings.JOB_RETENTION_SECONDS)
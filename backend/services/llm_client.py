@@ -0,0 +1,126 @@
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+from backend.config import settings
+from backend.services.generation_cache import generation_cache, prompt_fingerprint
+from typing import AsyncIterator, List, Dict, Any, Optional
+import json
+
+_http_client: Optional[httpx.AsyncClient] = None
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Return the process-wide async OpenAI client, creating it on first use
+    """
+    global _http_client, _client
+
+    if _client is None:
+        # One pooled HTTP connection pool shared by every generator
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=10.0)
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=_http_client,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            max_retries=settings.OPENAI_MAX_RETRIES
+        )
+
+    return _client
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+    return _semaphore
+
+async def close_llm_client() -> None:
+    """
+    Close the pooled HTTP connections (called on application shutdown)
+    """
+    global _http_client, _client
+
+    if _client is not None:
+        await _client.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+
+    _client = None
+    _http_client = None
+
+async def complete_json(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4o",
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    cache_endpoint: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run a JSON-mode chat completion without blocking the event loop
+    
+    Endpoints listed in GENERATION_CACHE_ENDPOINTS reuse earlier results for the same prompt.
+    """
+    use_cache = generation_cache.enabled_for(cache_endpoint)
+    
+    if use_cache:
+        cache_key = prompt_fingerprint(model, messages, temperature)
+        cached = await generation_cache.get(cache_endpoint, cache_key)
+        if cached is not None:
+            return cached
+    
+    client = get_llm_client()
+
+    # Limit the number of completions in flight across the whole worker
+    async with _get_semaphore():
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=temperature,
+            timeout=timeout or settings.OPENAI_TIMEOUT_SECONDS
+        )
+    
+    result = json.loads(response.choices[0].message.content)
+    
+    if use_cache:
+        await generation_cache.set(cache_key, result)
+    
+    return result
+
+async def stream_json(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4o",
+    temperature: float = 0.7,
+    timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Run a JSON-mode chat completion and yield the content deltas as they arrive
+    
+    The concurrency slot is held until the stream is exhausted or closed.
+    """
+    client = get_llm_client()
+    
+    async with _get_semaphore():
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=temperature,
+            timeout=timeout or settings.OPENAI_TIMEOUT_SECONDS,
+            stream=True
+        )
+        
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
@@ -0,0 +1,381 @@
+from backend.config import settings
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import re
+
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+
+# Share of the daily calories planned for each meal
+MEAL_CALORIE_SHARES = {
+    'breakfast': 0.25,
+    'lunch': 0.35,
+    'dinner': 0.30,
+    'snack': 0.10
+}
+
+# Portions are never scaled further than this to meet a calorie target
+MIN_PORTION_SCALE = 0.5
+MAX_PORTION_SCALE = 2.0
+
+MACROS = ("calories", "protein_g", "carbs_g", "fat_g")
+
+@dataclass
+class NutritionTargets:
+    """
+    Daily energy needs of a user (Mifflin-St Jeor BMR times an activity multiplier, adjusted for goals)
+    """
+    bmr: float
+    tdee: float
+    daily_calories: float
+    
+    def meal_calories(self, meal_type: str) -> int:
+        return int(self.daily_calories * MEAL_CALORIE_SHARES.get(meal_type, 0.30))
+
+def calculate_targets(profile: Dict[str, Any], goal_types: Sequence[str]) -> NutritionTargets:
+    """
+    Calorie targets from a profile, using the same defaults as the meal prompts
+    """
+    bmr = 10 * (profile.get('weight_kg') or 70) + 6.25 * (profile.get('height_cm') or 170) - 5 * (profile.get('age') or 30)
+    bmr += -161 if profile.get('gender') == 'female' else 5
+    
+    tdee = bmr * ACTIVITY_MULTIPLIERS.get(profile.get('activity_level') or 'moderate', 1.55)
+    
+    daily_calories = tdee
+    if 'Lose Weight' in goal_types:
+        daily_calories *= 0.85  # 15% deficit
+    elif 'Build Muscle' in goal_types:
+        daily_calories *= 1.1  # 10% surplus
+    
+    return NutritionTargets(bmr=bmr, tdee=tdee, daily_calories=daily_calories)
+
+# Food composition per 100 g: (aliases, kcal, protein g, carbs g, fat g, fiber g, grams per piece, grams per ml)
+# Values are rounded from USDA FoodData Central; grains, pasta and legumes are cooked weights.
+FOOD_COMPOSITION: List[Tuple[Tuple[str, ...], float, float, float, float, float, float, float]] = [
+    (("chicken breast", "chicken"), 165, 31, 0, 3.6, 0, 170, 1.0),
+    (("chicken thigh",), 209, 26, 0, 10.9, 0, 115, 1.0),
+    (("turkey breast", "turkey", "ground turkey"), 135, 29, 0, 1.7, 0, 110, 1.0),
+    (("ground beef", "beef mince", "lean beef"), 250, 26, 0, 15, 0, 110, 1.0),
+    (("steak", "beef", "sirloin"), 271, 25, 0, 19, 0, 225, 1.0),
+    (("pork loin", "pork tenderloin", "pork"), 242, 27, 0, 14, 0, 150, 1.0),
+    (("bacon",), 541, 37, 1.4, 42, 0, 8, 1.0),
+    (("ham",), 145, 21, 1.5, 5.5, 0, 28, 1.0),
+    (("sausage",), 301, 12, 2, 27, 0, 75, 1.0),
+    (("salmon",), 208, 20, 0, 13, 0, 170, 1.0),
+    (("tuna",), 116, 26, 0, 0.8, 0, 140, 1.0),
+    (("cod", "white fish", "tilapia"), 90, 19, 0, 1.5, 0, 170, 1.0),
+    (("shrimp", "prawn"), 99, 24, 0.2, 0.3, 0, 6, 1.0),
+    (("egg white",), 52, 11, 0.7, 0.2, 0, 33, 1.03),
+    (("egg",), 143, 12.6, 0.7, 9.5, 0, 50, 1.03),
+    (("tofu",), 144, 17, 3, 9, 2.3, 120, 1.0),
+    (("tempeh",), 192, 20, 7.6, 11, 0, 85, 1.0),
+    (("greek yogurt",), 73, 10, 3.9, 1.9, 0, 170, 1.03),
+    (("yogurt", "yoghurt"), 61, 3.5, 4.7, 3.3, 0, 170, 1.03),
+    (("cottage cheese",), 98, 11, 3.4, 4.3, 0, 110, 1.0),
+    (("almond milk",), 15, 0.6, 0.3, 1.2, 0.2, 240, 1.0),
+    (("oat milk",), 48, 1, 6.7, 2.1, 0.8, 240, 1.0),
+    (("coconut milk",), 230, 2.3, 6, 24, 2.2, 240, 1.0),
+    (("milk",), 61, 3.2, 4.8, 3.3, 0, 240, 1.03),
+    (("cheddar", "cheese"), 403, 25, 1.3, 33, 0, 28, 0.5),
+    (("feta", "feta cheese"), 264, 14, 4, 21, 0, 28, 0.6),
+    (("mozzarella", "mozzarella cheese"), 280, 28, 3, 17, 0, 28, 0.5),
+    (("parmesan", "parmesan cheese"), 431, 38, 4, 29, 0, 5, 0.4),
+    (("peanut butter", "almond butter", "nut butter"), 588, 25, 20, 50, 6, 16, 1.08),
+    (("butter",), 717, 0.9, 0.1, 81, 0, 14, 0.96),
+    (("olive oil", "oil", "coconut oil", "vegetable oil", "sesame oil"), 884, 0, 0, 100, 0, 14, 0.92),
+    (("brown rice",), 112, 2.3, 24, 0.8, 1.8, 195, 0.8),
+    (("rice",), 130, 2.7, 28, 0.3, 0.4, 160, 0.8),
+    (("quinoa",), 120, 4.4, 21, 1.9, 2.8, 185, 0.8),
+    (("pasta", "spaghetti", "penne", "noodle"), 158, 5.8, 31, 0.9, 1.8, 140, 0.6),
+    (("oat", "oatmeal", "rolled oats"), 389, 17, 66, 7, 10.6, 40, 0.41),
+    (("granola",), 471, 10, 64, 20, 7, 55, 0.5),
+    (("whole wheat bread", "whole grain bread", "whole-grain bread"), 247, 13, 41, 3.4, 7, 32, 0.3),
+    (("bread", "toast", "sourdough"), 265, 9, 49, 3.2, 2.7, 30, 0.3),
+    (("tortilla", "wrap"), 306, 8, 50, 8, 3.5, 45, 0.4),
+    (("sweet potato",), 86, 1.6, 20, 0.1, 3, 130, 0.6),
+    (("potato",), 77, 2, 17, 0.1, 2.2, 170, 0.6),
+    (("chickpea", "garbanzo"), 164, 8.9, 27, 2.6, 7.6, 1, 0.7),
+    (("black bean", "kidney bean", "bean"), 132, 8.9, 24, 0.5, 8.7, 1, 0.7),
+    (("lentil",), 116, 9, 20, 0.4, 7.9, 1, 0.8),
+    (("hummus",), 166, 7.9, 14, 9.6, 6, 15, 1.0),
+    (("almond",), 579, 21, 22, 50, 12.5, 1.2, 0.6),
+    (("walnut", "pecan"), 654, 15, 14, 65, 6.7, 4, 0.5),
+    (("chia seed", "chia", "flaxseed", "flax seed"), 486, 17, 42, 31, 34, 12, 0.65),
+    (("protein powder", "whey"), 400, 80, 8, 6, 0, 30, 0.4),
+    (("banana",), 89, 1.1, 23, 0.3, 2.6, 118, 0.6),
+    (("apple",), 52, 0.3, 14, 0.2, 2.4, 182, 0.5),
+    (("orange",), 47, 0.9, 12, 0.1, 2.4, 130, 0.7),
+    (("blueberry", "berry", "berries", "raspberry"), 57, 0.7, 14, 0.3, 2.4, 1.5, 0.6),
+    (("strawberry",), 32, 0.7, 7.7, 0.3, 2, 12, 0.6),
+    (("avocado",), 160, 2, 8.5, 14.7, 6.7, 150, 0.6),
+    (("spinach",), 23, 2.9, 3.6, 0.4, 2.2, 30, 0.13),
+    (("kale",), 49, 4.3, 9, 0.9, 3.6, 35, 0.15),
+    (("lettuce", "mixed greens", "salad greens", "arugula", "romaine"), 15, 1.4, 2.9, 0.2, 1.3, 10, 0.2),
+    (("broccoli",), 34, 2.8, 7, 0.4, 2.6, 150, 0.38),
+    (("tomato",), 18, 0.9, 3.9, 0.2, 1.2, 123, 0.7),
+    (("onion", "shallot"), 40, 1.1, 9.3, 0.1, 1.7, 110, 0.6),
+    (("bell pepper", "red pepper", "green pepper", "yellow pepper"), 31, 1, 6, 0.3, 2.1, 120, 0.5),
+    (("carrot",), 41, 0.9, 10, 0.2, 2.8, 61, 0.55),
+    (("cucumber",), 15, 0.7, 3.6, 0.1, 0.5, 300, 0.55),
+    (("zucchini", "courgette"), 17, 1.2, 3.1, 0.3, 1, 200, 0.55),
+    (("mushroom",), 22, 3.1, 3.3, 0.3, 1, 18, 0.3),
+    (("garlic",), 149, 6.4, 33, 0.5, 2.1, 3, 0.6),
+    (("honey",), 304, 0.3, 82, 0, 0.2, 21, 1.42),
+    (("maple syrup",), 260, 0, 67, 0.1, 0, 20, 1.32),
+    (("sugar",), 387, 0, 100, 0, 0, 4, 0.85),
+    (("flour",), 364, 10, 76, 1, 2.7, 1, 0.53),
+    (("soy sauce", "tamari"), 53, 8, 4.9, 0.6, 0.8, 15, 1.2),
+    (("salsa",), 36, 1.5, 7, 0.2, 1.9, 16, 1.0),
+    (("broth", "stock"), 7, 1, 0.6, 0.2, 0, 240, 1.0),
+    # Seasonings count as resolved but contribute nothing worth tracking
+    (("salt", "black pepper", "water", "herb", "spice", "basil", "cilantro", "parsley", "oregano", "thyme",
+      "rosemary", "cumin", "paprika", "cinnamon", "chili flake", "vinegar", "lemon juice", "lime juice",
+      "lemon zest", "ginger", "mustard"), 0, 0, 0, 0, 0, 1, 1.0),
+]
+
+# Grams per unit for weights, millilitres per unit for volumes; count units use the food's piece weight
+WEIGHT_UNITS = {"g": 1.0, "gram": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.35, "ounce": 28.35, "lb": 453.6, "pound": 453.6}
+VOLUME_UNITS = {
+    "ml": 1.0, "milliliter": 1.0, "millilitre": 1.0, "l": 1000.0, "liter": 1000.0, "litre": 1000.0,
+    "cup": 240.0, "tbsp": 15.0, "tablespoon": 15.0, "tsp": 5.0, "teaspoon": 5.0, "fl oz": 29.6
+}
+COUNT_UNITS = {
+    "": 1.0, "piece": 1.0, "whole": 1.0, "medium": 1.0, "large": 1.25, "small": 0.75,
+    "clove": 1.0, "slice": 1.0, "scoop": 1.0, "fillet": 1.0, "breast": 1.0
+}
+
+UNICODE_FRACTIONS = {"½": " 1/2", "⅓": " 1/3", "⅔": " 2/3", "¼": " 1/4", "¾": " 3/4", "⅛": " 1/8"}
+
+SEASONING = len(FOOD_COMPOSITION) - 1
+
+_COMPOSITION = np.array([row[1:6] for row in FOOD_COMPOSITION], dtype=float)
+_PIECE_GRAMS = np.array([row[6] for row in FOOD_COMPOSITION], dtype=float)
+_GRAMS_PER_ML = np.array([row[7] for row in FOOD_COMPOSITION], dtype=float)
+_ALIASES = sorted(((alias, i) for i, row in enumerate(FOOD_COMPOSITION) for alias in row[0]), key=lambda a: -len(a[0]))
+_ALIAS_INDEX = dict(_ALIASES)
+_ALIAS_PATTERN = re.compile(r"\b(" + "|".join(re.escape(alias) for alias, _ in _ALIASES) + r")(?:e?s)?\b")
+_AMOUNT_PATTERN = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(.*)$")
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(value or ""))
+    return float(match.group(1)) if match else None
+
+def match_food(name: str) -> Optional[int]:
+    """
+    Index of the food-composition row for an ingredient name
+    
+    The head noun usually comes last ("chicken broth", "peanut butter"), so the match ending
+    last wins; qualifiers after a comma or parenthesis are ignored.
+    """
+    name = re.split(r"[,(]", name.lower(), maxsplit=1)[0]
+    matches = list(_ALIAS_PATTERN.finditer(name))
+    if not matches:
+        return None
+    best = max(matches, key=lambda match: (match.end(), len(match.group(1))))
+    return _ALIAS_INDEX[best.group(1)]
+
+def parse_amount(amount: Any, unit: Optional[str]) -> Tuple[Optional[float], str]:
+    """
+    Split an LLM ingredient amount such as "1 1/2", "2-3" or "150g" into a quantity and a unit
+    """
+    if isinstance(amount, (int, float)):
+        return float(amount), (unit or "").strip().lower()
+    
+    text = str(amount or "")
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, fraction)
+    
+    match = _AMOUNT_PATTERN.match(text)
+    if not match:
+        return None, (unit or "").strip().lower()
+    
+    quantity = float(sum(Fraction(part) for part in match.group(1).split()))
+    if match.group(2):
+        # Ranges like "2-3" use the midpoint
+        quantity = (quantity + float(match.group(2))) / 2
+    
+    return quantity, (unit or match.group(3) or "").strip().lower()
+
+def _unit_key(unit: str, table: Dict[str, float]) -> Optional[str]:
+    unit = unit.rstrip(".")
+    for candidate in (unit, unit[:-1] if unit.endswith("s") else None, unit[:-2] if unit.endswith("es") else None):
+        if candidate is not None and candidate in table:
+            return candidate
+    return None
+
+def _ingredient_grams(food: int, quantity: Optional[float], unit: str) -> Optional[float]:
+    if food == SEASONING:
+        return 0.0
+    if quantity is None:
+        return None
+    
+    unit = "fl oz" if unit.startswith("fl oz") else unit.split(" ")[0] if unit else ""
+    
+    key = _unit_key(unit, WEIGHT_UNITS)
+    if key is not None:
+        return quantity * WEIGHT_UNITS[key]
+    
+    key = _unit_key(unit, VOLUME_UNITS)
+    if key is not None:
+        return quantity * VOLUME_UNITS[key] * _GRAMS_PER_ML[food]
+    
+    key = _unit_key(unit, COUNT_UNITS)
+    if key is not None:
+        return quantity * COUNT_UNITS[key] * _PIECE_GRAMS[food]
+    
+    return None
+
+def _ingredient_list(meal: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ingredients = meal.get('ingredients') or []
+    return [ingredient for ingredient in ingredients if isinstance(ingredient, dict)] if isinstance(ingredients, list) else []
+
+def analyze_meals(meals: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[List[Optional[float]]]]:
+    """
+    Ingredient-level macros for many meals in one vectorized pass over the composition table
+    
+    Returns per meal the computed (kcal, protein, carbs, fat, fiber) of the resolved ingredients,
+    the share of ingredients that were resolved, and the LLM calories of the unresolved ones,
+    plus the computed calories of every ingredient (None when unresolved).
+    """
+    meal_index, foods, grams = [], [], []
+    resolved = np.zeros(len(meals))
+    counts = np.zeros(len(meals))
+    unresolved_calories = np.zeros(len(meals))
+    positions: List[List[Optional[int]]] = []
+    
+    for m, meal in enumerate(meals):
+        meal_positions: List[Optional[int]] = []
+        
+        for ingredient in _ingredient_list(meal):
+            counts[m] += 1
+            food = match_food(str(ingredient.get('name', '')))
+            quantity, unit = parse_amount(ingredient.get('amount'), ingredient.get('unit'))
+            weight = _ingredient_grams(food, quantity, unit) if food is not None else None
+            
+            if weight is None:
+                unresolved_calories[m] += _number(ingredient.get('calories')) or 0
+                meal_positions.append(None)
+                continue
+            
+            resolved[m] += 1
+            meal_positions.append(len(grams))
+            meal_index.append(m)
+            foods.append(food)
+            grams.append(weight)
+        
+        positions.append(meal_positions)
+    
+    # (ingredients, 5) macros scaled from per-100 g values, then summed per meal
+    ingredient_macros = _COMPOSITION[np.array(foods, dtype=int)] * (np.array(grams, dtype=float) / 100.0)[:, None]
+    totals = np.zeros((len(meals), _COMPOSITION.shape[1]))
+    np.add.at(totals, np.array(meal_index, dtype=int), ingredient_macros)
+    
+    coverage = np.divide(resolved, counts, out=np.zeros(len(meals)), where=counts > 0)
+    ingredient_calories = [
+        [float(ingredient_macros[p, 0]) if p is not None else None for p in meal_positions]
+        for meal_positions in positions
+    ]
+    
+    return totals, coverage, unresolved_calories, ingredient_calories
+
+def _scale_amount(ingredient: Dict[str, Any], scale: float) -> None:
+    quantity, unit = parse_amount(ingredient.get('amount'), ingredient.get('unit'))
+    if quantity is None:
+        return
+    ingredient['amount'] = round(quantity * scale, 2)
+    if unit and not ingredient.get('unit'):
+        ingredient['unit'] = unit
+
+def check_meals(meals: Sequence[Dict[str, Any]], target_calories: Sequence[Optional[int]]) -> List[Dict[str, Any]]:
+    """
+    Validate LLM meals against the composition table and their calorie targets, correcting them in place
+    
+    Macros come from the ingredients when enough of them are recognised; otherwise the model's
+    macros are kept and its calories are checked against them (4/4/9 kcal per gram). A meal
+    that still misses its target by more than NUTRITION_CALORIE_TOLERANCE has its portions
+    scaled instead of being regenerated. Each meal gets a `nutrition_check` summary.
+    """
+    totals, coverage, unresolved_calories, ingredient_calories = analyze_meals(meals)
+    tolerance = settings.NUTRITION_CALORIE_TOLERANCE
+    
+    for m, meal in enumerate(meals):
+        if coverage[m] >= settings.NUTRITION_MIN_COVERAGE:
+            source = "ingredients"
+            values = {
+                "calories": totals[m, 0] + unresolved_calories[m],
+                "protein_g": totals[m, 1],
+                "carbs_g": totals[m, 2],
+                "fat_g": totals[m, 3],
+                "fiber_g": totals[m, 4]
+            }
+            for ingredient, calories in zip(_ingredient_list(meal), ingredient_calories[m]):
+                if calories is not None:
+                    ingredient['calories'] = round(calories)
+        else:
+            source = "model"
+            values = {key: _number(meal.get(key)) or 0.0 for key in (*MACROS, "fiber_g")}
+            atwater = 4 * values["protein_g"] + 4 * values["carbs_g"] + 9 * values["fat_g"]
+            if atwater > 0 and abs(values["calories"] - atwater) > tolerance * atwater:
+                source = "macros"
+                values["calories"] = atwater
+        
+        scale = 1.0
+        target = target_calories[m]
+        if target and values["calories"] > 0 and abs(values["calories"] - target) > tolerance * target:
+            scale = float(np.clip(target / values["calories"], MIN_PORTION_SCALE, MAX_PORTION_SCALE))
+            values = {key: value * scale for key, value in values.items()}
+            for ingredient in _ingredient_list(meal):
+                _scale_amount(ingredient, scale)
+                if _number(ingredient.get('calories')) is not None:
+                    ingredient['calories'] = round(_number(ingredient['calories']) * scale)
+        
+        meal.update({key: round(float(value), 1) for key, value in values.items()})
+        meal['calories'] = int(round(values["calories"]))
+        meal['nutrition_check'] = {
+            "source": source,
+            "coverage": round(float(coverage[m]), 2),
+            "target_calories": target,
+            "portion_scale": round(scale, 2)
+        }
+    
+    return list(meals)
+
+def check_meal(meal: Dict[str, Any], target_calories: Optional[int]) -> Dict[str, Any]:
+    return check_meals([meal], [target_calories])[0]
+
+def plan_totals(plans: Sequence[Dict[str, Dict[str, Any]]]) -> List[Dict[str, float]]:
+    """
+    Sum the macros of many days of meals at once, one totals dict per day
+    """
+    day_index = [d for d, meals in enumerate(plans) for _ in meals]
+    values = np.array(
+        [[_number(meal.get(key)) or 0.0 for key in MACROS] for meals in plans for meal in meals.values()],
+        dtype=float
+    ).reshape(-1, len(MACROS))
+    
+    totals = np.zeros((len(plans), len(MACROS)))
+    np.add.at(totals, np.array(day_index, dtype=int), values)
+    
+    return [{key: round(float(value), 1) for key, value in zip(MACROS, day)} for day in totals]
+
+def weekly_totals(plans: Sequence[Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Per-day totals of a week of meals with the week's sum and daily average
+    """
+    days = plan_totals(plans)
+    matrix = np.array([[day[key] for key in MACROS] for day in days], dtype=float).reshape(-1, len(MACROS))
+    
+    return {
+        "days": days,
+        "total": {key: round(float(value), 1) for key, value in zip(MACROS, matrix.sum(axis=0))},
+        "daily_average": {key: round(float(value), 1) for key, value in zip(MACROS, matrix.mean(axis=0) if len(days) else np.zeros(len(MACROS)))}
+    }
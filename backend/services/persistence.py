@@ -0,0 +1,67 @@
+from backend.config import settings
+from backend.database import UserSupabaseClient
+from backend.services.schedule_cache import schedule_cache
+from typing import List, Dict, Any, Optional
+
+def bulk_insert(supabase: UserSupabaseClient, table: str, records: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Insert many rows with one request per chunk and return the inserted rows in order
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    inserted = []
+    
+    try:
+        for i in range(0, len(records), chunk_size):
+            result = supabase.table(table).insert(records[i:i + chunk_size]).execute()
+            inserted.extend(result.data)
+    finally:
+        # Earlier chunks may have been written even if a later one failed
+        schedule_cache.invalidate_rows(table, records)
+    
+    return inserted
+
+def bulk_upsert(
+    supabase: UserSupabaseClient,
+    table: str,
+    records: List[Dict[str, Any]],
+    on_conflict: str,
+    ignore_duplicates: bool = False,
+    chunk_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Upsert many rows keyed on the on_conflict columns with one request per chunk
+    
+    With ignore_duplicates, rows that already exist are left untouched and not returned.
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    upserted = []
+    
+    try:
+        for i in range(0, len(records), chunk_size):
+            result = supabase.table(table).upsert(
+                records[i:i + chunk_size],
+                on_conflict=on_conflict,
+                ignore_duplicates=ignore_duplicates
+            ).execute()
+            upserted.extend(result.data)
+    finally:
+        schedule_cache.invalidate_rows(table, records)
+    
+    return upserted
+
+def insert_schedule(supabase: UserSupabaseClient, workouts: List[Dict[str, Any]], meals: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Insert all workouts and meals of a schedule and group the inserted rows by scheduled date
+    """
+    saved_workouts = bulk_insert(supabase, "workouts", workouts)
+    saved_meals = bulk_insert(supabase, "meals", meals)
+
+    by_date: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+    for workout in saved_workouts:
+        by_date.setdefault(workout["scheduled_date"], {"workouts": [], "meals": []})["workouts"].append(workout)
+
+    for meal in saved_meals:
+        by_date.setdefault(meal["scheduled_date"], {"workouts": [], "meals": []})["meals"].append(meal)
+
+    return by_date
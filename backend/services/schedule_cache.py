@@ -0,0 +1,97 @@
+import itertools
+import time
+from collections import OrderedDict
+from backend.config import settings
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Tables whose rows make up a schedule
+SCHEDULE_TABLES = ("workouts", "meals")
+
+class ScheduleCache:
+    """
+    Per-user cache of schedule range reads, invalidated whenever the user's workouts or meals change
+    
+    Every user has a version that moves forward on each write. Entries remember the version
+    they were read at and are only served while it is still current, so a read that raced a
+    write is never cached as fresh. Versions come from a clock-seeded counter and don't repeat
+    across restarts, so the least recently used ones can be forgotten like entries: a forgotten
+    user just gets a new version and rereads. Writes made outside this process (another worker, or the frontend writing to
+    Supabase directly) are only picked up once the TTL expires.
+    """
+    
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = itertools.count(int(time.time() * 1000))
+        # user_id -> version, least recently used first
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        # (user_id, range key) -> (version, expires_at, value)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+    
+    def version(self, user_id: str) -> int:
+        """Current schedule version of a user"""
+        if user_id not in self._versions:
+            self._set_version(user_id)
+        
+        self._versions.move_to_end(user_id)
+        return self._versions[user_id]
+    
+    def get(self, user_id: str, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((user_id, key))
+        
+        if entry is None or entry[0] != self.version(user_id) or entry[1] <= time.monotonic():
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self._entries.move_to_end((user_id, key))
+        return entry[2]
+    
+    def set(self, user_id: str, key: str, version: int, value: Dict[str, Any]) -> None:
+        """Store a read made at `version`; dropped if the user wrote in the meantime"""
+        if self.ttl_seconds <= 0 or version != self.version(user_id):
+            return
+        
+        self._entries[(user_id, key)] = (version, time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end((user_id, key))
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: str) -> None:
+        self._set_version(user_id)
+        self.invalidations += 1
+        
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == user_id]:
+            del self._entries[entry_key]
+    
+    def _set_version(self, user_id: str) -> None:
+        self._versions[user_id] = next(self._clock)
+        self._versions.move_to_end(user_id)
+        
+        while len(self._versions) > self.max_entries:
+            self._versions.popitem(last=False)
+    
+    def invalidate_rows(self, table: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Invalidate every user owning one of the written rows"""
+        if table not in SCHEDULE_TABLES:
+            return
+        
+        for user_id in {str(row["user_id"]) for row in rows if row.get("user_id")}:
+            self.invalidate(user_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "tracked_users": len(self._versions),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            "invalidations": self.invalidations
+        }
+
+schedule_cache = ScheduleCache(settings.SCHEDULE_CACHE_TTL_SECONDS, settings.SCHEDULE_CACHE_MAX_ENTRIES)
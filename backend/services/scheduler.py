@@ -1,88 +1,102 @@
 from backend.services.ai_workout_generator import generate_workout, generate_weekly_workout_plan
-from backend.services.ai_meal_planner import generate_meal, generate_daily_meal_plan
+from backend.services.ai_meal_planner import generate_meal, generate_daily_meal_plan, iter_daily_meals, calculate_daily_totals, MEAL_TYPES
+from backend.services.user_context import UserContext, load_user_context
+from backend.services.persistence import bulk_insert, insert_schedule
+from backend.services.schedule_cache import schedule_cache
+from backend.services.nutrition import weekly_totals
 from backend.database import get_supabase_user_client
-from typing import Dict, Any, List
+from backend.config import settings
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
 from datetime import date, datetime, timedelta
 import asyncio
 
-async def generate_daily_schedule(user_id: str, token: str, target_date: date) -> Dict[str, Any]:
+MEAL_TIMES = {
+    "breakfast": "08:00:00",
+    "lunch": "12:30:00",
+    "dinner": "18:30:00",
+    "snack": "15:00:00"
+}
+
+def _daily_workout_record(user_id: str, target_date: date, workout_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "title": workout_data["title"],
+        "description": workout_data["description"],
+        "workout_type": workout_data["workout_type"],
+        "duration_minutes": workout_data["duration_minutes"],
+        "calories_burned": workout_data.get("calories_burned"),
+        "intensity": workout_data["intensity"],
+        "scheduled_date": target_date.isoformat(),
+        "scheduled_time": "07:00:00",  # Default morning workout
+        "notes": f"AI Generated\n\nExercises:\n{chr(10).join([f'- {ex['name']}: {ex.get('sets', '')}x{ex.get('reps', '')}' for ex in workout_data.get('exercises', [])])}"
+    }
+
+def _daily_meal_record(user_id: str, target_date: date, meal_type: str, meal_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "title": meal_data["title"],
+        "description": meal_data["description"],
+        "meal_type": meal_data["meal_type"],
+        "calories": meal_data["calories"],
+        "protein_g": meal_data["protein_g"],
+        "carbs_g": meal_data["carbs_g"],
+        "fat_g": meal_data["fat_g"],
+        "ingredients": meal_data["ingredients"],
+        "scheduled_date": target_date.isoformat(),
+        "scheduled_time": MEAL_TIMES.get(meal_type),
+        "notes": f"AI Generated\n\nInstructions:\n{chr(10).join([f'{i+1}. {step}' for i, step in enumerate(meal_data.get('instructions', []))])}"
+    }
+
+def _existing_schedule(supabase, user_id: str, target_date: date) -> Dict[str, Any]:
     """
-    Generate a complete daily schedule with workouts and meals
+    Return the workouts and meals already saved for a date
     """
-    supabase = get_supabase_user_client(token)
-    
-    # Check if schedule already exists for this date
     existing_workouts = supabase.table("workouts").select("*").eq("user_id", user_id).eq("scheduled_date", target_date.isoformat()).execute()
     existing_meals = supabase.table("meals").select("*").eq("user_id", user_id).eq("scheduled_date", target_date.isoformat()).execute()
     
-    schedule = {
+    return {
         "date": target_date.isoformat(),
-        "workouts": [],
-        "meals": [],
+        "workouts": existing_workouts.data,
+        "meals": existing_meals.data,
         "generated": False
     }
+
+async def generate_daily_schedule(user_id: str, token: str, target_date: date) -> Dict[str, Any]:
+    """
+    Generate a complete daily schedule with workouts and meals
+    """
+    supabase = get_supabase_user_client(token)
+    
+    # Check if schedule already exists for this date
+    schedule = await asyncio.to_thread(_existing_schedule, supabase, user_id, target_date)
     
     # If schedule exists, return it
-    if existing_workouts.data or existing_meals.data:
-        schedule["workouts"] = existing_workouts.data
-        schedule["meals"] = existing_meals.data
-        schedule["generated"] = False
+    if schedule["workouts"] or schedule["meals"]:
         return schedule
     
     # Generate new schedule
     try:
+        # Load the user's profile once and share it with every generator
+        user_context = await load_user_context(user_id, token)
+        
         # Generate workout and meals in parallel
-        workout_task = generate_workout(user_id, token, preferences={"scheduled_date": target_date.isoformat()})
-        meal_plan_task = generate_daily_meal_plan(user_id, token, target_date.isoformat())
+        workout_task = generate_workout(user_id, token, preferences={"scheduled_date": target_date.isoformat()}, user_context=user_context)
+        meal_plan_task = generate_daily_meal_plan(user_id, token, target_date.isoformat(), user_context=user_context)
         
         workout_data, meal_plan_data = await asyncio.gather(workout_task, meal_plan_task)
         
-        # Save workout
-        workout_record = {
-            "user_id": user_id,
-            "title": workout_data["title"],
-            "description": workout_data["description"],
-            "workout_type": workout_data["workout_type"],
-            "duration_minutes": workout_data["duration_minutes"],
-            "calories_burned": workout_data.get("calories_burned"),
-            "intensity": workout_data["intensity"],
-            "scheduled_date": target_date.isoformat(),
-            "scheduled_time": "07:00:00",  # Default morning workout
-            "notes": f"AI Generated\n\nExercises:\n{chr(10).join([f'- {ex['name']}: {ex.get('sets', '')}x{ex.get('reps', '')}' for ex in workout_data.get('exercises', [])])}"
-        }
-        
-        workout_result = supabase.table("workouts").insert(workout_record).execute()
-        schedule["workouts"] = workout_result.data
+        workout_record = _daily_workout_record(user_id, target_date, workout_data)
+        meal_records = [
+            _daily_meal_record(user_id, target_date, meal_type, meal_data)
+            for meal_type, meal_data in meal_plan_data["meals"].items()
+        ]
         
-        # Save meals
-        meal_times = {
-            "breakfast": "08:00:00",
-            "lunch": "12:30:00",
-            "dinner": "18:30:00",
-            "snack": "15:00:00"
-        }
+        # Save the workout and all meals with one insert per table, off the event loop
+        saved_by_date = await asyncio.to_thread(insert_schedule, supabase, [workout_record], meal_records)
+        saved = saved_by_date.get(target_date.isoformat(), {"workouts": [], "meals": []})
         
-        saved_meals = []
-        for meal_type, meal_data in meal_plan_data["meals"].items():
-            meal_record = {
-                "user_id": user_id,
-                "title": meal_data["title"],
-                "description": meal_data["description"],
-                "meal_type": meal_data["meal_type"],
-                "calories": meal_data["calories"],
-                "protein_g": meal_data["protein_g"],
-                "carbs_g": meal_data["carbs_g"],
-                "fat_g": meal_data["fat_g"],
-                "ingredients": meal_data["ingredients"],
-                "scheduled_date": target_date.isoformat(),
-                "scheduled_time": meal_times.get(meal_type),
-                "notes": f"AI Generated\n\nInstructions:\n{chr(10).join([f'{i+1}. {step}' for i, step in enumerate(meal_data.get('instructions', []))])}"
-            }
-            
-            meal_result = supabase.table("meals").insert(meal_record).execute()
-            saved_meals.extend(meal_result.data)
-        
-        schedule["meals"] = saved_meals
+        schedule["workouts"] = saved["workouts"]
+        schedule["meals"] = saved["meals"]
         schedule["generated"] = True
         schedule["daily_nutrition"] = meal_plan_data["daily_totals"]
         
@@ -91,41 +105,127 @@ async def generate_daily_schedule(user_id: str, token: str, target_date: date) -
     except Exception as e:
         raise Exception(f"Failed to generate daily schedule: {str(e)}")
 
-async def generate_weekly_schedule(user_id: str, token: str, start_date: date, days_per_week: int = 4) -> Dict[str, Any]:
+async def stream_daily_schedule(user_id: str, token: str, target_date: date) -> AsyncIterator[Dict[str, Any]]:
     """
-    Generate a complete weekly schedule with workouts and meals
+    Generate a daily schedule like generate_daily_schedule, yielding the workout and each meal as soon as they are ready
+    
+    Events are "started", then "workout" and "meal" in completion order, then the saved "schedule".
+    Failures are reported as a final "error" event because the response has already started.
     """
+    yield {"event": "started", "date": target_date.isoformat()}
+    
     supabase = get_supabase_user_client(token)
+    producers: List[asyncio.Task] = []
     
     try:
-        # Generate workout plan and meal plan in parallel
-        workout_plan_task = generate_weekly_workout_plan(user_id, token, days_per_week)
+        schedule = await asyncio.to_thread(_existing_schedule, supabase, user_id, target_date)
         
-        workout_plan = await workout_plan_task
+        if schedule["workouts"] or schedule["meals"]:
+            yield {"event": "schedule", "schedule": schedule}
+            return
         
-        weekly_schedule = {
-            "start_date": start_date.isoformat(),
-            "end_date": (start_date + timedelta(days=6)).isoformat(),
-            "days": []
-        }
+        user_context = await load_user_context(user_id, token)
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce_workout():
+            try:
+                workout_data = await generate_workout(user_id, token, preferences={"scheduled_date": target_date.isoformat()}, user_context=user_context)
+                await queue.put(("workout", None, workout_data))
+            except Exception as e:
+                # Surface failures through the queue so the consumer never waits forever
+                await queue.put(("error", None, e))
+        
+        async def produce_meals():
+            try:
+                async for meal_type, meal_data in iter_daily_meals(user_id, token, target_date.isoformat(), user_context):
+                    await queue.put(("meal", meal_type, meal_data))
+            except Exception as e:
+                await queue.put(("error", None, e))
+        
+        producers = [asyncio.create_task(produce_workout()), asyncio.create_task(produce_meals())]
         
-        # Generate schedule for each day
-        for day_num in range(7):
-            current_date = start_date + timedelta(days=day_num)
+        workout_data = None
+        meals = {}
+        
+        while workout_data is None or len(meals) < len(MEAL_TYPES):
+            kind, meal_type, data = await queue.get()
             
+            if kind == "error":
+                raise data
+            if kind == "workout":
+                workout_data = data
+                yield {"event": "workout", "workout": data}
+            else:
+                meals[meal_type] = data
+                yield {"event": "meal", "meal_type": meal_type, "meal": data}
+        
+        meals = {meal_type: meals[meal_type] for meal_type in MEAL_TYPES}
+        meal_records = [_daily_meal_record(user_id, target_date, meal_type, meal_data) for meal_type, meal_data in meals.items()]
+        
+        saved = (await asyncio.to_thread(
+            insert_schedule, supabase, [_daily_workout_record(user_id, target_date, workout_data)], meal_records
+        )).get(target_date.isoformat(), {"workouts": [], "meals": []})
+        
+        schedule["workouts"] = saved["workouts"]
+        schedule["meals"] = saved["meals"]
+        schedule["generated"] = True
+        schedule["daily_nutrition"] = calculate_daily_totals(meals)
+        
+        yield {"event": "schedule", "schedule": schedule}
+        
+    except Exception as e:
+        yield {"event": "error", "detail": f"Failed to generate daily schedule: {str(e)}"}
+    finally:
+        # The client may disconnect mid-stream; stop any generation still running
+        for task in producers:
+            task.cancel()
+
+async def generate_weekly_schedule(
+    user_id: str,
+    token: str,
+    start_date: date,
+    days_per_week: int = 4,
+    on_day_complete: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Generate a complete weekly schedule with workouts and meals
+    
+    on_day_complete is called with each date as soon as that day's meals are generated.
+    """
+    supabase = get_supabase_user_client(token)
+    
+    day_semaphore = asyncio.Semaphore(settings.SCHEDULER_DAY_CONCURRENCY)
+    
+    async def generate_day_meals(current_date: date) -> Dict[str, Any]:
+        async with day_semaphore:
+            meal_plan = await generate_daily_meal_plan(user_id, token, current_date.isoformat(), user_context=user_context)
+        
+        if on_day_complete:
+            on_day_complete(current_date.isoformat())
+        
+        return meal_plan
+    
+    try:
+        # Load the user's profile once and share it with every generator
+        user_context = await load_user_context(user_id, token)
+        
+        dates = [start_date + timedelta(days=day_num) for day_num in range(7)]
+        
+        # Generate the workout plan and every day's meals in parallel
+        workout_plan, *meal_plans = await asyncio.gather(
+            generate_weekly_workout_plan(user_id, token, days_per_week, user_context=user_context),
+            *[generate_day_meals(current_date) for current_date in dates]
+        )
+        
+        workout_records = []
+        meal_records = []
+        
+        for day_num, (current_date, meal_plan) in enumerate(zip(dates, meal_plans)):
             # Check if it's a workout day
             workout_for_day = next((w for w in workout_plan if w["day"] == day_num + 1), None)
             
-            day_schedule = {
-                "date": current_date.isoformat(),
-                "day_name": current_date.strftime("%A"),
-                "workouts": [],
-                "meals": []
-            }
-            
-            # Save workout if it's a workout day
             if workout_for_day and workout_for_day["workout_type"] != "rest":
-                workout_record = {
+                workout_records.append({
                     "user_id": user_id,
                     "title": workout_for_day["title"],
                     "description": workout_for_day["description"],
@@ -135,24 +235,10 @@ async def generate_weekly_schedule(user_id: str, token: str, start_date: date, d
                     "scheduled_date": current_date.isoformat(),
                     "scheduled_time": "07:00:00",
                     "notes": f"Focus: {workout_for_day.get('focus', '')}"
-                }
-                
-                workout_result = supabase.table("workouts").insert(workout_record).execute()
-                day_schedule["workouts"] = workout_result.data
-            
-            # Generate and save meals for each day
-            meal_plan = await generate_daily_meal_plan(user_id, token, current_date.isoformat())
+                })
             
-            meal_times = {
-                "breakfast": "08:00:00",
-                "lunch": "12:30:00",
-                "dinner": "18:30:00",
-                "snack": "15:00:00"
-            }
-            
-            saved_meals = []
             for meal_type, meal_data in meal_plan["meals"].items():
-                meal_record = {
+                meal_records.append({
                     "user_id": user_id,
                     "title": meal_data["title"],
                     "description": meal_data["description"],
@@ -163,55 +249,130 @@ async def generate_weekly_schedule(user_id: str, token: str, start_date: date, d
                     "fat_g": meal_data["fat_g"],
                     "ingredients": meal_data["ingredients"],
                     "scheduled_date": current_date.isoformat(),
-                    "scheduled_time": meal_times.get(meal_type),
+                    "scheduled_time": MEAL_TIMES.get(meal_type),
                     "notes": f"Prep: {meal_data.get('prep_time_minutes', 0)}min"
-                }
-                
-                meal_result = supabase.table("meals").insert(meal_record).execute()
-                saved_meals.extend(meal_result.data)
-            
-            day_schedule["meals"] = saved_meals
-            day_schedule["daily_nutrition"] = meal_plan["daily_totals"]
-            
-            weekly_schedule["days"].append(day_schedule)
+                })
+        
+        # Persist the whole week with one insert per table, off the event loop
+        saved_by_date = await asyncio.to_thread(insert_schedule, supabase, workout_records, meal_records)
+        
+        # Every day's totals and the week's in one pass over all meals
+        nutrition = weekly_totals([meal_plan["meals"] for meal_plan in meal_plans])
+        
+        weekly_schedule = {
+            "start_date": start_date.isoformat(),
+            "end_date": (start_date + timedelta(days=6)).isoformat(),
+            "days": [],
+            "weekly_nutrition": {"total": nutrition["total"], "daily_average": nutrition["daily_average"]}
+        }
+        
+        for current_date, daily_nutrition in zip(dates, nutrition["days"]):
+            saved = saved_by_date.get(current_date.isoformat(), {"workouts": [], "meals": []})
+            weekly_schedule["days"].append({
+                "date": current_date.isoformat(),
+                "day_name": current_date.strftime("%A"),
+                "workouts": saved["workouts"],
+                "meals": saved["meals"],
+                "daily_nutrition": daily_nutrition
+            })
         
         return weekly_schedule
         
     except Exception as e:
         raise Exception(f"Failed to generate weekly schedule: {str(e)}")
 
-async def get_schedule(user_id: str, token: str, start_date: date, end_date: date) -> Dict[str, Any]:
+async def generate_weekly_workout_schedule(
+    user_id: str,
+    token: str,
+    start_date: date,
+    days_per_week: int = 4,
+    user_context: Optional[UserContext] = None
+) -> Dict[str, Any]:
     """
-    Get existing schedule for a date range
+    Generate a weekly workout plan and save its workouts starting at start_date
+    
+    The whole week comes from a single completion, so there is no per-day progress to report.
     """
     supabase = get_supabase_user_client(token)
     
-    # Fetch workouts
-    workouts_result = supabase.table("workouts").select("*").eq("user_id", user_id).gte("scheduled_date", start_date.isoformat()).lte("scheduled_date", end_date.isoformat()).order("scheduled_date").execute()
+    user_context = user_context or await load_user_context(user_id, token)
+    plan = await generate_weekly_workout_plan(user_id, token, days_per_week, user_context=user_context)
     
-    # Fetch meals
-    meals_result = supabase.table("meals").select("*").eq("user_id", user_id).gte("scheduled_date", start_date.isoformat()).lte("scheduled_date", end_date.isoformat()).order("scheduled_date").execute()
+    # Save workouts to database
+    workout_records = []
+    for day_plan in plan:
+        if day_plan["workout_type"] != "rest":
+            workout_date = start_date + timedelta(days=day_plan["day"] - 1)
+            
+            workout_records.append({
+                "user_id": user_id,
+                "title": day_plan["title"],
+                "description": day_plan["description"],
+                "workout_type": day_plan["workout_type"],
+                "duration_minutes": day_plan["duration_minutes"],
+                "intensity": day_plan["intensity"],
+                "scheduled_date": workout_date.isoformat(),
+                "notes": f"Focus: {day_plan.get('focus', '')}"
+            })
     
-    # Organize by date
-    schedule_by_date = {}
+    # The write is blocking, so keep it off the event loop
+    saved_workouts = await asyncio.to_thread(bulk_insert, supabase, "workouts", workout_records)
     
-    for workout in workouts_result.data:
-        workout_date = workout["scheduled_date"]
-        if workout_date not in schedule_by_date:
-            schedule_by_date[workout_date] = {"date": workout_date, "workouts": [], "meals": []}
-        schedule_by_date[workout_date]["workouts"].append(workout)
+    return {
+        "plan": plan,
+        "saved_workouts": saved_workouts
+    }
+
+def _schedule_rows(supabase, table: str, user_id: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    # A total order keeps the response, and its ETag, identical while the data is unchanged
+    result = supabase.table(table).select("*").eq("user_id", user_id).gte("scheduled_date", start_date.isoformat()).lte("scheduled_date", end_date.isoformat()).order("scheduled_date").order("scheduled_time").order("id").execute()
+    return result.data
+
+async def get_schedule(user_id: str, token: str, start_date: date, end_date: date, fill_empty_days: bool = False) -> Dict[str, Any]:
+    """
+    Get existing schedule for a date range, one entry per day in date order
     
-    for meal in meals_result.data:
-        meal_date = meal["scheduled_date"]
-        if meal_date not in schedule_by_date:
-            schedule_by_date[meal_date] = {"date": meal_date, "workouts": [], "meals": []}
-        schedule_by_date[meal_date]["meals"].append(meal)
+    Days without workouts or meals are left out unless fill_empty_days is set. Reads are
+    served from the schedule cache until the user's workouts or meals change; `version` is
+    the user's schedule version the result was read at.
+    """
+    cache_key = f"{start_date.isoformat()}:{end_date.isoformat()}:{int(fill_empty_days)}"
+    version = schedule_cache.version(user_id)
+    cached = schedule_cache.get(user_id, cache_key)
     
-    return {
+    if cached is not None:
+        return cached
+    
+    supabase = get_supabase_user_client(token)
+    
+    workouts, meals = await asyncio.gather(
+        asyncio.to_thread(_schedule_rows, supabase, "workouts", user_id, start_date, end_date),
+        asyncio.to_thread(_schedule_rows, supabase, "meals", user_id, start_date, end_date)
+    )
+    
+    schedule_by_date: Dict[str, Dict[str, Any]] = {}
+    
+    if fill_empty_days:
+        for offset in range((end_date - start_date).days + 1):
+            day = (start_date + timedelta(days=offset)).isoformat()
+            schedule_by_date[day] = {"date": day, "workouts": [], "meals": []}
+    
+    for key, rows in (("workouts", workouts), ("meals", meals)):
+        for row in rows:
+            day = row["scheduled_date"]
+            if day not in schedule_by_date:
+                schedule_by_date[day] = {"date": day, "workouts": [], "meals": []}
+            schedule_by_date[day][key].append(row)
+    
+    schedule = {
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
-        "schedule": list(schedule_by_date.values())
+        "version": version,
+        "schedule": [schedule_by_date[day] for day in sorted(schedule_by_date)]
     }
+    schedule_cache.set(user_id, cache_key, version, schedule)
+    
+    return schedule
 
 async def update_schedule_item(user_id: str, token: str, item_type: str, item_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -226,6 +387,8 @@ async def update_schedule_item(user_id: str, token: str, item_type: str, item_id
     if not result.data:
         raise Exception(f"{item_type.capitalize()} not found")
     
+    schedule_cache.invalidate(user_id)
+    
     return result.data[0]
 
 async def delete_schedule_item(user_id: str, token: str, item_type: str, item_id: str) -> bool:
@@ -238,4 +401,7 @@ async def delete_schedule_item(user_id: str, token: str, item_type: str, item_id
     
     result = supabase.table(table_name).delete().eq("id", item_id).eq("user_id", user_id).execute()
     
+    if result.data:
+        schedule_cache.invalidate(user_id)
+    
     return len(result.data) > 0
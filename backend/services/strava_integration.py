@@ -1,13 +1,114 @@
+import asyncio
 import httpx
+import time
 from backend.config import settings
 from backend.database import get_supabase_user_client
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from backend.services.persistence import bulk_upsert
+from backend.services.schedule_cache import schedule_cache
+from backend.services.strava_rate_limit import BULK, INTERACTIVE, RateLimitExceeded, rate_limiter
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
 STRAVA_AUTH_URL = "https://www.strava.com/oauth/authorize"
 STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"
 STRAVA_API_BASE = "https://www.strava.com/api/v3"
 
+# Workouts imported from Strava use the "strava" provider; planned workouts pushed to Strava
+# use this one so syncs and webhooks never treat them as imports to overwrite or delete
+PUSHED_PROVIDER = "strava_push"
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+# user id -> (access token, expires at); refreshes are single-flight per user
+_access_tokens: Dict[str, Tuple[str, float]] = {}
+_refresh_locks: Dict[str, asyncio.Lock] = {}
+
+# user id -> (fetched at, athlete and stats)
+_athlete_stats: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_stats_refreshes: Dict[str, asyncio.Task] = {}
+
+# Map Strava activity type to our workout type
+ACTIVITY_TYPE_MAP = {
+    "Run": "cardio",
+    "Ride": "cardio",
+    "Swim": "cardio",
+    "Walk": "cardio",
+    "Hike": "cardio",
+    "WeightTraining": "strength",
+    "Workout": "strength",
+    "Yoga": "flexibility",
+    "Crossfit": "strength"
+}
+
+# Measured by Strava; the other fields of an imported workout may have been edited by the user
+STRAVA_OWNED_FIELDS = ("duration_minutes", "calories_burned", "scheduled_date", "scheduled_time", "completed_at")
+
+class StravaAuthorizationRevoked(Exception):
+    """Strava rejected the user's refresh token, so the athlete no longer authorizes the app"""
+
+def create_strava_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP/2 client used for every call to Strava
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.STRAVA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.STRAVA_MAX_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(settings.STRAVA_TIMEOUT_SECONDS, connect=5.0),
+        http2=True,
+        transport=transport
+    )
+
+def get_strava_client() -> httpx.AsyncClient:
+    """
+    Return the app-lifetime Strava client, creating it if the app didn't open one
+    """
+    global _http_client
+    
+    if _http_client is None:
+        _http_client = create_strava_client()
+    
+    return _http_client
+
+def set_strava_client(client: Optional[httpx.AsyncClient]) -> None:
+    """
+    Replace the Strava client, e.g. with one built on an httpx.MockTransport
+    """
+    global _http_client
+    _http_client = client
+
+async def open_strava_client() -> None:
+    """
+    Open the pooled client (called on application startup)
+    """
+    get_strava_client()
+
+async def close_strava_client() -> None:
+    """
+    Close the pooled connections (called on application shutdown)
+    """
+    global _http_client
+    
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+async def strava_request(method: str, url: str, priority: int = INTERACTIVE, **kwargs) -> httpx.Response:
+    """
+    Send an API request within the app-wide Strava rate limit
+    """
+    await rate_limiter.acquire(priority)
+    
+    response = await get_strava_client().request(method, url, **kwargs)
+    rate_limiter.update(response.headers)
+    
+    if response.status_code == 429:
+        rate_limiter.exhaust_short_window()
+        raise RateLimitExceeded(max(int(rate_limiter.seconds_until_budget(priority)) + 1, 1))
+    
+    return response
+
 async def get_authorization_url(redirect_uri: str, state: str) -> str:
     """
     Generate Strava OAuth authorization URL
@@ -27,60 +128,103 @@ async def exchange_code_for_token(code: str) -> Dict[str, Any]:
     """
     Exchange authorization code for access token
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            STRAVA_TOKEN_URL,
-            data={
-                "client_id": settings.STRAVA_CLIENT_ID,
-                "client_secret": settings.STRAVA_CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code"
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to exchange code: {response.text}")
-        
-        return response.json()
+    client = get_strava_client()
+    
+    response = await client.post(
+        STRAVA_TOKEN_URL,
+        data={
+            "client_id": settings.STRAVA_CLIENT_ID,
+            "client_secret": settings.STRAVA_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code"
+        }
+    )
+    
+    if response.status_code != 200:
+        raise Exception(f"Failed to exchange code: {response.text}")
+    
+    return response.json()
 
 async def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
     """
     Refresh expired access token
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            STRAVA_TOKEN_URL,
-            data={
-                "client_id": settings.STRAVA_CLIENT_ID,
-                "client_secret": settings.STRAVA_CLIENT_SECRET,
-                "refresh_token": refresh_token,
-                "grant_type": "refresh_token"
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to refresh token: {response.text}")
-        
-        return response.json()
+    client = get_strava_client()
+    
+    response = await client.post(
+        STRAVA_TOKEN_URL,
+        data={
+            "client_id": settings.STRAVA_CLIENT_ID,
+            "client_secret": settings.STRAVA_CLIENT_SECRET,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token"
+        }
+    )
+    
+    if response.status_code in (400, 401):
+        raise StravaAuthorizationRevoked(f"Failed to refresh token: {response.text}")
+    if response.status_code != 200:
+        raise Exception(f"Failed to refresh token: {response.text}")
+    
+    return response.json()
 
-async def get_valid_token(user_id: str, token: str) -> str:
+def cache_access_token(user_id: str, access_token: str, expires_at: float) -> None:
     """
-    Get a valid access token, refreshing if necessary
+    Remember a user's current access token until shortly before it expires
     """
-    supabase = get_supabase_user_client(token)
+    _access_tokens[user_id] = (access_token, expires_at)
+
+def forget_access_token(user_id: str) -> None:
+    _access_tokens.pop(user_id, None)
+
+def _cached_access_token(user_id: str) -> Optional[str]:
+    cached = _access_tokens.get(user_id)
     
-    # Get Strava integration
-    result = supabase.table("external_integrations").select("*").eq("user_id", user_id).eq("provider", "strava").single().execute()
+    # Treat tokens about to expire as expired so they are refreshed ahead of time
+    if cached and cached[1] - settings.STRAVA_TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+        return cached[0]
     
-    if not result.data:
-        raise Exception("Strava not connected")
+    return None
+
+async def get_valid_token(user_id: str, token: str) -> str:
+    """
+    Get a valid access token, refreshing if necessary
+    """
+    return await get_integration_token(user_id, get_supabase_user_client(token))
+
+async def get_integration_token(user_id: str, supabase) -> str:
+    """
+    Get a valid access token through the given Supabase client, refreshing if necessary
     
-    integration = result.data
+    Concurrent callers for the same user share one refresh, so Strava's rotating refresh
+    token is only ever spent once.
+    """
+    access_token = _cached_access_token(user_id)
+    if access_token:
+        return access_token
     
-    # Check if token is expired
-    expires_at = datetime.fromisoformat(integration["token_expires_at"].replace("Z", "+00:00"))
+    lock = _refresh_locks.setdefault(user_id, asyncio.Lock())
     
-    if datetime.now(expires_at.tzinfo) >= expires_at:
+    async with lock:
+        # Another caller may have refreshed while we waited
+        access_token = _cached_access_token(user_id)
+        if access_token:
+            return access_token
+        
+        # Get Strava integration
+        result = supabase.table("external_integrations").select("id, access_token, refresh_token, token_expires_at").eq("user_id", user_id).eq("provider", "strava").single().execute()
+        
+        if not result.data:
+            raise Exception("Strava not connected")
+        
+        integration = result.data
+        expires_at = datetime.fromisoformat(integration["token_expires_at"].replace("Z", "+00:00")).timestamp()
+        cache_access_token(user_id, integration["access_token"], expires_at)
+        
+        access_token = _cached_access_token(user_id)
+        if access_token:
+            return access_token
+        
         # Refresh token
         token_data = await refresh_access_token(integration["refresh_token"])
         
@@ -88,139 +232,330 @@ async def get_valid_token(user_id: str, token: str) -> str:
         supabase.table("external_integrations").update({
             "access_token": token_data["access_token"],
             "refresh_token": token_data["refresh_token"],
-            "token_expires_at": datetime.fromtimestamp(token_data["expires_at"]).isoformat()
+            "token_expires_at": datetime.fromtimestamp(token_data["expires_at"], timezone.utc).isoformat()
         }).eq("id", integration["id"]).execute()
         
+        cache_access_token(user_id, token_data["access_token"], token_data["expires_at"])
+        
         return token_data["access_token"]
+
+async def authorization_revoked(user_id: str, supabase) -> bool:
+    """
+    Confirm with Strava that the athlete revoked access: the refresh or an API call must be rejected
+    """
+    try:
+        access_token = await get_integration_token(user_id, supabase)
+    except StravaAuthorizationRevoked:
+        return True
     
-    return integration["access_token"]
+    response = await strava_request(
+        "GET",
+        f"{STRAVA_API_BASE}/athlete",
+        priority=BULK,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    
+    return response.status_code == 401
 
-async def get_athlete_stats(user_id: str, token: str) -> Dict[str, Any]:
+async def _get_athlete_json(access_token: str, path: str, error: str) -> Dict[str, Any]:
+    response = await strava_request(
+        "GET",
+        f"{STRAVA_API_BASE}{path}",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    
+    if response.status_code != 200:
+        raise Exception(f"{error}: {response.text}")
+    
+    return response.json()
+
+async def fetch_athlete_stats(user_id: str, token: str) -> Dict[str, Any]:
     """
-    Get athlete statistics from Strava
+    Get athlete profile and statistics from Strava
     """
+    supabase = get_supabase_user_client(token)
     access_token = await get_valid_token(user_id, token)
     
-    async with httpx.AsyncClient() as client:
-        # Get athlete profile
-        athlete_response = await client.get(
-            f"{STRAVA_API_BASE}/athlete",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        
-        if athlete_response.status_code != 200:
-            raise Exception(f"Failed to get athlete: {athlete_response.text}")
-        
-        athlete = athlete_response.json()
-        
-        # Get athlete stats
-        stats_response = await client.get(
-            f"{STRAVA_API_BASE}/athletes/{athlete['id']}/stats",
-            headers={"Authorization": f"Bearer {access_token}"}
+    # The athlete id saved on connect lets both calls run at once
+    integration = supabase.table("external_integrations").select("metadata").eq("user_id", user_id).eq("provider", "strava").single().execute()
+    athlete_id = ((integration.data or {}).get("metadata") or {}).get("athlete_id")
+    
+    if athlete_id:
+        athlete, stats = await asyncio.gather(
+            _get_athlete_json(access_token, "/athlete", "Failed to get athlete"),
+            _get_athlete_json(access_token, f"/athletes/{athlete_id}/stats", "Failed to get stats")
         )
-        
-        if stats_response.status_code != 200:
-            raise Exception(f"Failed to get stats: {stats_response.text}")
-        
-        stats = stats_response.json()
-        
-        return {
-            "athlete": athlete,
-            "stats": stats
-        }
+    else:
+        athlete = await _get_athlete_json(access_token, "/athlete", "Failed to get athlete")
+        stats = await _get_athlete_json(access_token, f"/athletes/{athlete['id']}/stats", "Failed to get stats")
+    
+    return {
+        "athlete": athlete,
+        "stats": stats
+    }
+
+async def _refresh_athlete_stats(user_id: str, token: str) -> Dict[str, Any]:
+    try:
+        result = await fetch_athlete_stats(user_id, token)
+        _athlete_stats[user_id] = (time.time(), result)
+        return result
+    finally:
+        _stats_refreshes.pop(user_id, None)
 
-async def get_activities(user_id: str, token: str, after: Optional[datetime] = None, before: Optional[datetime] = None, per_page: int = 30) -> List[Dict[str, Any]]:
+async def get_athlete_stats(user_id: str, token: str) -> Dict[str, Any]:
     """
-    Get activities from Strava
+    Get athlete statistics from Strava, served from a per-user cache
+    
+    Fresh entries are returned as is; stale ones are returned while a background refresh
+    replaces them. Concurrent misses for the same user share one fetch.
     """
-    access_token = await get_valid_token(user_id, token)
+    cached = _athlete_stats.get(user_id)
+    age = time.time() - cached[0] if cached else None
+    
+    if cached and age < settings.STRAVA_STATS_TTL_SECONDS:
+        return cached[1]
+    
+    refresh = _stats_refreshes.get(user_id)
+    if refresh is None:
+        refresh = _stats_refreshes[user_id] = asyncio.create_task(_refresh_athlete_stats(user_id, token))
+    
+    if cached and age < settings.STRAVA_STATS_TTL_SECONDS + settings.STRAVA_STATS_STALE_SECONDS:
+        # Retrieve the task's exception so a failed background refresh isn't reported as unhandled
+        refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return cached[1]
+    
+    return await asyncio.shield(refresh)
+
+def forget_athlete_stats(user_id: str) -> None:
+    _athlete_stats.pop(user_id, None)
+
+async def _fetch_activity_page(access_token: str, params: Dict[str, Any], priority: int = INTERACTIVE) -> List[Dict[str, Any]]:
+    response = await strava_request(
+        "GET",
+        f"{STRAVA_API_BASE}/athlete/activities",
+        priority=priority,
+        headers={"Authorization": f"Bearer {access_token}"},
+        params=params
+    )
+    
+    if response.status_code != 200:
+        raise Exception(f"Failed to get activities: {response.text}")
     
-    params = {"per_page": per_page}
+    return response.json()
+
+def _activity_params(after: Optional[datetime], before: Optional[datetime], per_page: int, page: int) -> Dict[str, Any]:
+    params = {"per_page": per_page, "page": page}
     
     if after:
         params["after"] = int(after.timestamp())
     if before:
         params["before"] = int(before.timestamp())
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{STRAVA_API_BASE}/athlete/activities",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params=params
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to get activities: {response.text}")
-        
-        return response.json()
+    return params
 
-async def sync_activities(user_id: str, token: str, days: int = 7) -> Dict[str, Any]:
+async def get_activity(access_token: str, activity_id: int, priority: int = INTERACTIVE) -> Optional[Dict[str, Any]]:
     """
-    Sync recent activities from Strava to database
+    Get one activity from Strava, or None if it no longer exists
     """
-    supabase = get_supabase_user_client(token)
+    response = await strava_request(
+        "GET",
+        f"{STRAVA_API_BASE}/activities/{activity_id}",
+        priority=priority,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
     
-    # Get activities from last N days
-    after = datetime.now() - timedelta(days=days)
-    activities = await get_activities(user_id, token, after=after)
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise Exception(f"Failed to get activity: {response.text}")
     
-    synced_count = 0
-    skipped_count = 0
+    return response.json()
+
+async def get_activities(user_id: str, token: str, after: Optional[datetime] = None, before: Optional[datetime] = None, per_page: int = 30, page: int = 1) -> List[Dict[str, Any]]:
+    """
+    Get activities from Strava
+    """
+    access_token = await get_valid_token(user_id, token)
     
+    return await _fetch_activity_page(access_token, _activity_params(after, before, per_page, page))
+
+async def iter_activity_pages(
+    user_id: str,
+    token: str,
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    per_page: Optional[int] = None,
+    prefetch: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield every page of activities in the range, fetching up to `prefetch` pages ahead
+    
+    With `after` set Strava returns activities oldest first, so each page can be checkpointed.
+    """
+    per_page = per_page or settings.STRAVA_SYNC_PAGE_SIZE
+    prefetch = settings.STRAVA_SYNC_PREFETCH_PAGES if prefetch is None else prefetch
+    access_token = await get_valid_token(user_id, token)
+    
+    def fetch(page: int) -> asyncio.Task:
+        # Backfills yield to interactive calls when the quota runs low
+        return asyncio.create_task(_fetch_activity_page(access_token, _activity_params(after, before, per_page, page), priority=BULK))
+    
+    next_page = 1
+    pending = []
+    
+    try:
+        while True:
+            # Keep the current page plus `prefetch` more in flight
+            while len(pending) < prefetch + 1:
+                pending.append(fetch(next_page))
+                next_page += 1
+            
+            activities = await pending.pop(0)
+            
+            if activities:
+                yield activities
+            
+            # A short page is the last one
+            if len(activities) < per_page:
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+        # Retrieve the outcome of prefetches that already failed so they aren't logged as never retrieved
+        await asyncio.gather(*pending, return_exceptions=True)
+
+def activity_to_workout(user_id: str, activity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the workout record for an imported Strava activity
+    """
+    workout_type = ACTIVITY_TYPE_MAP.get(activity["type"], "cardio")
+    
+    return {
+        "user_id": user_id,
+        "title": activity["name"],
+        "description": f"Synced from Strava - {activity['type']}",
+        "workout_type": workout_type,
+        "duration_minutes": int(activity["moving_time"] / 60),
+        "calories_burned": int(activity.get("calories", 0)),
+        "intensity": "high" if activity.get("average_heartrate", 0) > 150 else "medium" if activity.get("average_heartrate", 0) > 120 else "low",
+        "scheduled_date": activity["start_date_local"].split("T")[0],
+        "scheduled_time": activity["start_date_local"].split("T")[1].split("Z")[0],
+        "completed": True,
+        "completed_at": activity["start_date"],
+        "external_provider": "strava",
+        "external_id": str(activity["id"]),
+        "notes": f"Strava ID: {activity['id']}\nDistance: {activity.get('distance', 0) / 1000:.2f} km\nElevation: {activity.get('total_elevation_gain', 0)} m\nAvg HR: {activity.get('average_heartrate', 'N/A')}"
+    }
+
+def import_activities(supabase, user_id: str, activities: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Save the activities that haven't been imported yet, with one lookup and one upsert per batch
+    """
+    if not activities:
+        return {"synced": 0, "skipped": 0}
+    
+    # Check which activities already exist
+    external_ids = list({str(activity["id"]) for activity in activities})
+    existing = supabase.table("workouts").select("external_id").eq("user_id", user_id).in_("external_provider", ["strava", PUSHED_PROVIDER]).in_("external_id", external_ids).execute()
+    existing_ids = {row["external_id"] for row in existing.data}
+    
+    new_workouts = {}
     for activity in activities:
-        # Check if activity already exists
-        existing = supabase.table("workouts").select("id").eq("user_id", user_id).eq("notes", f"Strava ID: {activity['id']}").execute()
-        
-        if existing.data:
-            skipped_count += 1
-            continue
-        
-        # Map Strava activity type to our workout type
-        activity_type_map = {
-            "Run": "cardio",
-            "Ride": "cardio",
-            "Swim": "cardio",
-            "Walk": "cardio",
-            "Hike": "cardio",
-            "WeightTraining": "strength",
-            "Workout": "strength",
-            "Yoga": "flexibility",
-            "Crossfit": "strength"
-        }
-        
-        workout_type = activity_type_map.get(activity["type"], "cardio")
-        
-        # Create workout record
-        workout_record = {
-            "user_id": user_id,
-            "title": activity["name"],
-            "description": f"Synced from Strava - {activity['type']}",
-            "workout_type": workout_type,
-            "duration_minutes": int(activity["moving_time"] / 60),
-            "calories_burned": int(activity.get("calories", 0)),
-            "intensity": "high" if activity.get("average_heartrate", 0) > 150 else "medium" if activity.get("average_heartrate", 0) > 120 else "low",
-            "scheduled_date": activity["start_date_local"].split("T")[0],
-            "scheduled_time": activity["start_date_local"].split("T")[1].split("Z")[0],
-            "completed": True,
-            "completed_at": activity["start_date"],
-            "notes": f"Strava ID: {activity['id']}\nDistance: {activity.get('distance', 0) / 1000:.2f} km\nElevation: {activity.get('total_elevation_gain', 0)} m\nAvg HR: {activity.get('average_heartrate', 'N/A')}"
-        }
+        if str(activity["id"]) not in existing_ids:
+            new_workouts[str(activity["id"])] = activity_to_workout(user_id, activity)
+    
+    # The unique key also guards against a concurrent sync importing the same activity
+    bulk_upsert(
+        supabase,
+        "workouts",
+        list(new_workouts.values()),
+        on_conflict="user_id,external_provider,external_id",
+        ignore_duplicates=True
+    )
+    
+    return {
+        "synced": len(new_workouts),
+        "skipped": len(activities) - len(new_workouts)
+    }
+
+def update_imported_activities(supabase, user_id: str, activities: List[Dict[str, Any]]) -> None:
+    """
+    Save the latest state of activities; workouts already imported only take the fields Strava owns
+    """
+    if not activities:
+        return
+    
+    external_ids = [str(activity["id"]) for activity in activities]
+    existing = supabase.table("workouts").select("*").eq("user_id", user_id).eq("external_provider", "strava").in_("external_id", external_ids).execute()
+    existing_rows = {row["external_id"]: row for row in existing.data}
+    
+    new_workouts = []
+    updated_workouts = []
+    for activity in activities:
+        workout = activity_to_workout(user_id, activity)
+        row = existing_rows.get(workout["external_id"])
         
-        supabase.table("workouts").insert(workout_record).execute()
-        synced_count += 1
+        if row is None:
+            new_workouts.append(workout)
+        else:
+            updated_workouts.append({**row, **{field: workout[field] for field in STRAVA_OWNED_FIELDS}})
+    
+    # A concurrent sync may have imported a new activity meanwhile; its row is kept as is
+    bulk_upsert(supabase, "workouts", new_workouts, on_conflict="user_id,external_provider,external_id", ignore_duplicates=True)
+    bulk_upsert(supabase, "workouts", updated_workouts, on_conflict="user_id,external_provider,external_id")
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+async def sync_activities(user_id: str, token: str, days: int = 7, full: bool = False) -> Dict[str, Any]:
+    """
+    Sync activities from Strava to database
+    
+    Sync resumes from the integration's last_synced_at, the start time of the newest imported
+    activity, which is saved after every page so an interrupted backfill continues where it
+    stopped. The first sync, or a full one, goes back `days` days.
+    """
+    supabase = get_supabase_user_client(token)
+    
+    integration = supabase.table("external_integrations").select("last_synced_at").eq("user_id", user_id).eq("provider", "strava").single().execute()
     
-    # Update last synced timestamp
-    supabase.table("external_integrations").update({
-        "last_synced_at": datetime.now().isoformat()
-    }).eq("user_id", user_id).eq("provider", "strava").execute()
+    if not integration.data:
+        raise Exception("Strava not connected")
+    
+    last_synced_at = integration.data.get("last_synced_at")
+    
+    if last_synced_at and not full:
+        after = _parse_timestamp(last_synced_at)
+    else:
+        after = datetime.now(timezone.utc) - timedelta(days=days)
+    
+    synced = 0
+    skipped = 0
+    pages = 0
+    
+    async for activities in iter_activity_pages(user_id, token, after=after):
+        counts = import_activities(supabase, user_id, activities)
+        synced += counts["synced"]
+        skipped += counts["skipped"]
+        pages += 1
+        
+        # Checkpoint the high-water mark once the page is saved
+        newest = max(_parse_timestamp(activity["start_date"]) for activity in activities)
+        if newest > after:
+            after = newest
+            supabase.table("external_integrations").update({
+                "last_synced_at": newest.isoformat()
+            }).eq("user_id", user_id).eq("provider", "strava").execute()
     
     return {
-        "synced": synced_count,
-        "skipped": skipped_count,
-        "total": len(activities)
+        "synced": synced,
+        "skipped": skipped,
+        "total": synced + skipped,
+        "pages": pages,
+        "synced_through": after.isoformat()
     }
 
-async def create_activity(user_id: str, token: str, workout_data: Dict[str, Any]) -> Dict[str, Any]:
+async def create_activity(user_id: str, token: str, workout_data: Dict[str, Any], priority: int = INTERACTIVE) -> Dict[str, Any]:
     """
     Create an activity on Strava from a workout
     """
@@ -237,21 +572,102 @@ async def create_activity(user_id: str, token: str, workout_data: Dict[str, Any]
     activity_data = {
         "name": workout_data["title"],
         "type": type_map.get(workout_data["workout_type"], "Workout"),
-        "start_date_local": f"{workout_data['scheduled_date']}T{workout_data.get('scheduled_time', '12:00:00')}Z",
+        "start_date_local": f"{workout_data['scheduled_date']}T{workout_data.get('scheduled_time') or '12:00:00'}Z",
         "elapsed_time": workout_data["duration_minutes"] * 60,
         "description": workout_data.get("description", ""),
         "trainer": 1,  # Indoor activity
         "commute": 0
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{STRAVA_API_BASE}/activities",
-            headers={"Authorization": f"Bearer {access_token}"},
-            json=activity_data
-        )
+    response = await strava_request(
+        "POST",
+        f"{STRAVA_API_BASE}/activities",
+        priority=priority,
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=activity_data
+    )
+    
+    if response.status_code not in [200, 201]:
+        raise Exception(f"Failed to create activity: {response.text}")
+    
+    return response.json()
+
+def record_pushed_activity(supabase, user_id: str, workout_id: str, activity_id: Any) -> None:
+    """
+    Link a workout to the Strava activity created from it so it isn't pushed or imported again
+    """
+    supabase.table("workouts").update({
+        "external_provider": PUSHED_PROVIDER,
+        "external_id": str(activity_id)
+    }).eq("id", workout_id).eq("user_id", user_id).execute()
+    schedule_cache.invalidate(user_id)
+
+async def push_workouts(
+    user_id: str,
+    token: str,
+    workout_ids: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    max_workouts: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Create Strava activities for many workouts and return one result per workout
+    
+    Workouts are loaded with one query, those already linked to a Strava activity are
+    skipped, and the rest are pushed concurrently as bulk calls under the rate limiter.
+    Raises ValueError when the selection holds more than max_workouts workouts.
+    An activity created on Strava whose link could not be saved is reported as
+    "unrecorded" with its id, since pushing that workout again would duplicate it.
+    """
+    max_workouts = max_workouts or settings.STRAVA_PUSH_MAX_WORKOUTS
+    supabase = get_supabase_user_client(token)
+    
+    query = supabase.table("workouts").select("*").eq("user_id", user_id)
+    if workout_ids:
+        query = query.in_("id", workout_ids)
+    if start_date:
+        query = query.gte("scheduled_date", start_date.isoformat())
+    if end_date:
+        query = query.lte("scheduled_date", end_date.isoformat())
+    
+    # One row past the cap is enough to tell the selection is too large
+    workouts = query.order("scheduled_date").limit(max_workouts + 1).execute().data
+    
+    if len(workouts) > max_workouts:
+        raise ValueError(f"At most {max_workouts} workouts can be pushed at once")
+    
+    results = {str(workout_id): {"workout_id": str(workout_id), "status": "not_found"} for workout_id in workout_ids or []}
+    semaphore = asyncio.Semaphore(settings.STRAVA_PUSH_CONCURRENCY)
+    
+    async def push(workout: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"workout_id": str(workout["id"])}
+        
+        if workout.get("external_id"):
+            return {**result, "status": "skipped", "strava_activity_id": workout["external_id"]}
         
-        if response.status_code not in [200, 201]:
-            raise Exception(f"Failed to create activity: {response.text}")
+        try:
+            async with semaphore:
+                activity = await create_activity(user_id, token, workout, priority=BULK)
+        except RateLimitExceeded as e:
+            return {**result, "status": "rate_limited", "retry_after": e.retry_after}
+        except Exception as e:
+            return {**result, "status": "failed", "error": str(e)}
         
-        return response.json()
+        result["strava_activity_id"] = str(activity["id"])
+        
+        try:
+            # The write is blocking; in a thread the pushes keep running concurrently
+            await asyncio.to_thread(record_pushed_activity, supabase, user_id, workout["id"], activity["id"])
+        except Exception as e:
+            return {**result, "status": "unrecorded", "error": str(e)}
+        
+        return {**result, "status": "created"}
+    
+    # Fetch the token once up front instead of racing a refresh from every push
+    if any(not workout.get("external_id") for workout in workouts):
+        await get_valid_token(user_id, token)
+    
+    for result in await asyncio.gather(*[push(workout) for workout in workouts]):
+        results[result["workout_id"]] = result
+    
+    return list(results.values())
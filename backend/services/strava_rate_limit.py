@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import itertools
+import time
+from backend.config import settings
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+BULK = 1
+
+SHORT_WINDOW_SECONDS = 15 * 60
+DAILY_WINDOW_SECONDS = 24 * 60 * 60
+
+class RateLimitExceeded(Exception):
+    """The Strava quota can't serve the call soon enough; retry after `retry_after` seconds"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Strava rate limit reached, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+class StravaRateLimiter:
+    """
+    App-wide budget for the Strava 15-minute and daily quotas
+    
+    Usage is counted locally between responses and corrected from the X-RateLimit-Usage and
+    X-RateLimit-Limit headers Strava returns. Bulk calls stop short of the limit so interactive
+    calls always have a reserve, waiting calls are served in priority order, and a call that
+    would have to wait longer than its priority allows fails with a retry-after hint.
+    """
+    
+    def __init__(self, short_limit: int, daily_limit: int, interactive_reserve: float, max_wait: Dict[int, float]):
+        self.limits = [short_limit, daily_limit]
+        self.usage = [0, 0]
+        self.interactive_reserve = interactive_reserve
+        self.max_wait = max_wait
+        self.throttled = 0
+        self._window_starts = self._current_windows()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+    
+    @staticmethod
+    def _current_windows(now: Optional[float] = None) -> List[int]:
+        # Strava resets the short window every quarter hour and the daily one at midnight UTC
+        now = now or time.time()
+        return [int(now // SHORT_WINDOW_SECONDS), int(now // DAILY_WINDOW_SECONDS)]
+    
+    def _roll_windows(self) -> None:
+        windows = self._current_windows()
+        for i, window in enumerate(windows):
+            if window != self._window_starts[i]:
+                self.usage[i] = 0
+        self._window_starts = windows
+    
+    def _budget(self, priority: int) -> List[int]:
+        if priority == INTERACTIVE:
+            return self.limits
+        return [int(limit * (1 - self.interactive_reserve)) for limit in self.limits]
+    
+    def _has_budget(self, priority: int) -> bool:
+        return all(used < budget for used, budget in zip(self.usage, self._budget(priority)))
+    
+    def seconds_until_budget(self, priority: int) -> float:
+        """Time until every exhausted window resets for a call of this priority"""
+        now = time.time()
+        wait = 0.0
+        
+        if self.usage[1] >= self._budget(priority)[1]:
+            wait = (self._window_starts[1] + 1) * DAILY_WINDOW_SECONDS - now
+        elif self.usage[0] >= self._budget(priority)[0]:
+            wait = (self._window_starts[0] + 1) * SHORT_WINDOW_SECONDS - now
+        
+        return max(wait, 0.0)
+    
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait for a slot in both windows, or raise RateLimitExceeded"""
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, ticket)
+        deadline = time.time() + self.max_wait.get(priority, 0.0)
+        
+        try:
+            while True:
+                self._roll_windows()
+                
+                if self._waiters[0] == ticket and self._has_budget(priority):
+                    heapq.heappop(self._waiters)
+                    self.usage = [used + 1 for used in self.usage]
+                    return
+                
+                # Wait for the windows to reset, or briefly for callers ahead in the queue
+                wait = self.seconds_until_budget(priority) or 0.05
+                
+                if time.time() + wait > deadline:
+                    self.throttled += 1
+                    raise RateLimitExceeded(max(int(wait) + 1, 1))
+                
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+    
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Take the authoritative counters from a Strava response"""
+        self._roll_windows()
+        
+        for header, values in (("X-RateLimit-Limit", self.limits), ("X-RateLimit-Usage", self.usage)):
+            raw = headers.get(header)
+            if not raw:
+                continue
+            try:
+                parsed = [int(part) for part in raw.split(",")[:2]]
+            except ValueError:
+                continue
+            values[:len(parsed)] = parsed
+    
+    def exhaust_short_window(self) -> None:
+        """Strava answered 429, so treat the current window as used up"""
+        self.usage[0] = max(self.usage[0], self.limits[0])
+    
+    def stats(self) -> Dict[str, Any]:
+        self._roll_windows()
+        return {
+            "limits": {"15_minutes": self.limits[0], "daily": self.limits[1]},
+            "usage": {"15_minutes": self.usage[0], "daily": self.usage[1]},
+            "waiting": len(self._waiters),
+            "throttled": self.throttled
+        }
+
+rate_limiter = StravaRateLimiter(
+    settings.STRAVA_RATE_LIMIT_15_MIN,
+    settings.STRAVA_RATE_LIMIT_DAILY,
+    settings.STRAVA_INTERACTIVE_RESERVE,
+    {
+        INTERACTIVE: settings.STRAVA_INTERACTIVE_MAX_WAIT_SECONDS,
+        BULK: settings.STRAVA_BULK_MAX_WAIT_SECONDS
+    }
+)
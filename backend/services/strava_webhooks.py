@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from backend.config import settings
+from backend.database import get_supabase_client
+from backend.services.schedule_cache import schedule_cache
+from backend.services.strava_integration import (
+    PUSHED_PROVIDER,
+    authorization_revoked,
+    forget_access_token,
+    forget_athlete_stats,
+    get_activity,
+    get_integration_token,
+    update_imported_activities
+)
+from backend.services.strava_rate_limit import BULK, RateLimitExceeded
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class WebhookIngestor:
+    """
+    Applies Strava webhook events to the imported workouts in the background
+    
+    Events are acknowledged immediately and grouped per athlete; a batch is processed after
+    a short delay so a burst of edits to the same activities costs one fetch per activity.
+    Events only say what changed, so deletions and deauthorizations are confirmed with Strava
+    before anything is removed.
+    """
+    
+    def __init__(self, workers: int, coalesce_seconds: float):
+        self.workers = workers
+        self.coalesce_seconds = coalesce_seconds
+        self.processed = 0
+        # athlete id -> {"activities": {activity id: "upsert" | "delete"}, "deauthorized": bool}
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def enqueue(self, event: Dict[str, Any]) -> None:
+        athlete_id = int(event["owner_id"])
+        
+        if event["object_type"] == "athlete":
+            if str((event.get("updates") or {}).get("authorized", "")).lower() == "false":
+                self._pending_batch(athlete_id)["deauthorized"] = True
+        elif event["object_type"] == "activity":
+            # Create and update both resolve to the latest state; the last event per activity wins
+            action = "delete" if event["aspect_type"] == "delete" else "upsert"
+            self._pending_batch(athlete_id)["activities"][int(event["object_id"])] = action
+    
+    def _pending_batch(self, athlete_id: int, delay: Optional[float] = None) -> Dict[str, Any]:
+        batch = self._pending.get(athlete_id)
+        
+        if batch is None:
+            batch = self._pending[athlete_id] = {"activities": {}, "deauthorized": False}
+            asyncio.get_running_loop().call_later(delay or self.coalesce_seconds, self._queue.put_nowait, athlete_id)
+        
+        return batch
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_athletes": len(self._pending),
+            "processed_batches": self.processed
+        }
+    
+    async def _work(self) -> None:
+        while True:
+            athlete_id = await self._queue.get()
+            batch = self._pending.pop(athlete_id, None)
+            
+            if batch is None:
+                continue
+            
+            try:
+                await self._process(athlete_id, batch)
+            except RateLimitExceeded as e:
+                # Put the batch back, keeping any newer events for the same activities
+                retry = self._pending_batch(athlete_id, delay=e.retry_after)
+                retry["deauthorized"] = retry["deauthorized"] or batch["deauthorized"]
+                retry["activities"] = {**batch["activities"], **retry["activities"]}
+            except Exception:
+                logger.exception("Failed to process Strava events for athlete %s", athlete_id)
+            
+            self.processed += 1
+    
+    async def _process(self, athlete_id: int, batch: Dict[str, Any]) -> None:
+        # Webhooks carry no user session, so the service client is used and every query is scoped by user_id
+        supabase = get_supabase_client()
+        
+        integration = supabase.table("external_integrations").select("user_id").eq("provider", "strava").eq("metadata->>athlete_id", str(athlete_id)).execute()
+        
+        if not integration.data:
+            return
+        
+        user_id = str(integration.data[0]["user_id"])
+        
+        if batch["deauthorized"]:
+            if not await authorization_revoked(user_id, supabase):
+                logger.warning("Ignoring deauthorization of athlete %s, Strava still accepts their token", athlete_id)
+                return
+            
+            forget_access_token(user_id)
+            forget_athlete_stats(user_id)
+            supabase.table("external_integrations").update({
+                "access_token": None,
+                "refresh_token": None,
+                "is_active": False
+            }).eq("user_id", user_id).eq("provider", "strava").execute()
+            return
+        
+        upserts = [activity_id for activity_id, action in batch["activities"].items() if action == "upsert"]
+        deletes = [activity_id for activity_id, action in batch["activities"].items() if action == "delete"]
+        
+        if upserts:
+            # Activities pushed from a planned workout already have their row
+            pushed = supabase.table("workouts").select("external_id").eq("user_id", user_id).eq("external_provider", PUSHED_PROVIDER).in_("external_id", [str(activity_id) for activity_id in upserts]).execute()
+            pushed_ids = {row["external_id"] for row in pushed.data}
+            upserts = [activity_id for activity_id in upserts if str(activity_id) not in pushed_ids]
+        
+        if not upserts and not deletes:
+            return
+        
+        access_token = await get_integration_token(user_id, supabase)
+        activity_ids = [*upserts, *deletes]
+        activities = dict(zip(activity_ids, await asyncio.gather(*[get_activity(access_token, activity_id, priority=BULK) for activity_id in activity_ids])))
+        
+        update_imported_activities(supabase, user_id, [activities[activity_id] for activity_id in upserts if activities[activity_id] is not None])
+        
+        # Only remove workouts whose activity Strava no longer has
+        deleted = [str(activity_id) for activity_id in deletes if activities[activity_id] is None]
+        if deleted:
+            supabase.table("workouts").delete().eq("user_id", user_id).eq("external_provider", "strava").in_("external_id", deleted).execute()
+            schedule_cache.invalidate(user_id)
+
+def accepts_event(subscription_id: int) -> bool:
+    """Only take events from the configured push subscription; without one every event is rejected"""
+    return bool(settings.STRAVA_WEBHOOK_VERIFY_TOKEN) and bool(settings.STRAVA_WEBHOOK_SUBSCRIPTION_ID) and subscription_id == settings.STRAVA_WEBHOOK_SUBSCRIPTION_ID
+
+def verify_subscription(mode: Optional[str], verify_token: Optional[str]) -> bool:
+    """Check a subscription validation request against the configured verify token"""
+    return mode == "subscribe" and bool(settings.STRAVA_WEBHOOK_VERIFY_TOKEN) and verify_token == settings.STRAVA_WEBHOOK_VERIFY_TOKEN
+
+webhook_ingestor = WebhookIngestor(settings.STRAVA_WEBHOOK_WORKERS, settings.STRAVA_WEBHOOK_COALESCE_SECONDS)
@@ -0,0 +1,79 @@
+from backend.config import settings
+from backend.database import get_supabase_user_client
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple
+import asyncio
+import time
+
+@dataclass
+class UserContext:
+    """
+    Profile, goals, dietary preferences and recent history used by the AI generators
+    """
+    user_id: str
+    profile: Dict[str, Any]
+    goals: List[Dict[str, Any]] = field(default_factory=list)
+    dietary_preferences: List[Dict[str, Any]] = field(default_factory=list)
+    recent_meals: List[Dict[str, Any]] = field(default_factory=list)
+    recent_workouts: List[Dict[str, Any]] = field(default_factory=list)
+
+    def preference_values(self, *preference_types: str) -> List[str]:
+        return [d['value'] for d in self.dietary_preferences if d['preference_type'] in preference_types]
+
+    @property
+    def goal_types(self) -> List[str]:
+        return [g['goal_type'] for g in self.goals]
+
+# user_id -> (expires_at, context), oldest first
+_cache: "OrderedDict[str, Tuple[float, UserContext]]" = OrderedDict()
+
+async def load_user_context(user_id: str, token: str, use_cache: bool = True) -> UserContext:
+    """
+    Load everything the generators need about a user with concurrent queries
+    """
+    ttl = settings.USER_CONTEXT_TTL_SECONDS
+
+    if use_cache and ttl > 0:
+        cached = _cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+    supabase = get_supabase_user_client(token)
+
+    # The Supabase client is synchronous, so run the queries on worker threads
+    profile_result, goals_result, diet_result, meals_result, workouts_result = await asyncio.gather(
+        asyncio.to_thread(lambda: supabase.table("profiles").select("*").eq("id", user_id).single().execute()),
+        asyncio.to_thread(lambda: supabase.table("user_goals").select("*").eq("user_id", user_id).execute()),
+        asyncio.to_thread(lambda: supabase.table("dietary_preferences").select("*").eq("user_id", user_id).execute()),
+        asyncio.to_thread(lambda: supabase.table("meals").select("title, meal_type").eq("user_id", user_id).order("scheduled_date", desc=True).limit(7).execute()),
+        asyncio.to_thread(lambda: supabase.table("workouts").select("title, workout_type").eq("user_id", user_id).order("scheduled_date", desc=True).limit(5).execute())
+    )
+
+    context = UserContext(
+        user_id=user_id,
+        profile=profile_result.data,
+        goals=goals_result.data,
+        dietary_preferences=diet_result.data,
+        recent_meals=meals_result.data,
+        recent_workouts=workouts_result.data
+    )
+
+    if ttl > 0:
+        _cache.pop(user_id, None)
+        if len(_cache) >= settings.USER_CONTEXT_CACHE_SIZE:
+            now = time.monotonic()
+            for key in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+                del _cache[key]
+        # Every entry is still fresh, so make room by dropping the oldest
+        while _cache and len(_cache) >= settings.USER_CONTEXT_CACHE_SIZE:
+            _cache.popitem(last=False)
+        _cache[user_id] = (time.monotonic() + ttl, context)
+
+    return context
+
+def invalidate_user_context(user_id: str) -> None:
+    """
+    Drop the cached context after the user's profile or goals change
+    """
+    _cache.pop(str(user_id), None)
@@ -0,0 +1,20 @@
+import json
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict
+
+async def _ndjson_lines(events: AsyncIterator[Dict[str, Any]], error_detail: str) -> AsyncIterator[str]:
+    try:
+        async for event in events:
+            yield json.dumps(event, default=str) + "\n"
+    except Exception as e:
+        # Headers are already sent, so failures are reported as the last event
+        yield json.dumps({"event": "error", "detail": f"{error_detail}: {str(e)}"}) + "\n"
+
+def ndjson_response(events: AsyncIterator[Dict[str, Any]], error_detail: str) -> StreamingResponse:
+    """Stream events to the client as newline-delimited JSON, one object per line"""
+    return StreamingResponse(
+        _ndjson_lines(events, error_detail),
+        media_type="application/x-ndjson",
+        # Keep reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,53 @@
+import pytest
+from uuid import uuid4
+from backend.pagination import decode_cursor, encode_cursor, fetch_page
+
+class FakeQuery:
+    """Records the keyset filter and returns a fixed set of rows"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.filter = None
+    
+    def or_(self, value):
+        self.filter = value
+        return self
+    
+    def order(self, column):
+        return self
+    
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+    
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+@pytest.mark.parametrize("scheduled_date", [
+    "2026-10-17",
+    "2026-10-17T00:00:00+00:00",
+    "2026-10-17T00:00:00.123456+00:00",
+    "2026-10-17T00:00:00Z"
+])
+def test_cursor_round_trip(scheduled_date):
+    row_id = uuid4()
+    
+    assert decode_cursor(encode_cursor({"scheduled_date": scheduled_date, "id": row_id})) == (scheduled_date, row_id)
+
+@pytest.mark.parametrize("scheduled_date", ["2026-10-17", "2026-10-17T00:00:00+00:00"])
+def test_next_page_filters_after_last_row(scheduled_date):
+    rows = [{"scheduled_date": scheduled_date, "id": uuid4()} for _ in range(3)]
+    
+    page, cursor = fetch_page(FakeQuery(rows), limit=2)
+    assert page == rows[:2]
+    
+    query = FakeQuery(rows[2:])
+    page, next_cursor = fetch_page(query, limit=2, cursor=cursor)
+    
+    assert page == rows[2:] and next_cursor is None
+    assert query.filter == f'scheduled_date.gt."{scheduled_date}",and(scheduled_date.eq."{scheduled_date}",id.gt.{rows[1]["id"]})'
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor({"scheduled_date": "yesterday", "id": uuid4()})])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -58,8 +58,11 @@ CREATE TABLE IF NOT EXISTS public.workouts (
   calories_burned INTEGER,
   scheduled_date TIMESTAMPTZ,
   completed BOOLEAN DEFAULT FALSE,
+  external_provider TEXT,
+  external_id TEXT,
   created_at TIMESTAMPTZ DEFAULT NOW(),
-  updated_at TIMESTAMPTZ DEFAULT NOW()
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  CONSTRAINT workouts_user_external_key UNIQUE (user_id, external_provider, external_id)
 );
 
 -- ============================================
@@ -0,0 +1,26 @@
+-- Track which external activity a workout was imported from
+alter table public.workouts add column if not exists external_provider text;
+alter table public.workouts add column if not exists external_id text;
+
+-- Backfill workouts imported from Strava before the columns existed
+update public.workouts
+set
+  external_provider = 'strava',
+  external_id = substring(notes from 'Strava ID: (\d+)')
+where external_id is null
+  and notes ~ '^Strava ID: \d+';
+
+-- Drop duplicate imports so the unique constraint can be created, keeping the oldest
+-- (ties on created_at are broken by id so exactly one row survives)
+delete from public.workouts w
+using public.workouts d
+where w.external_id is not null
+  and w.user_id = d.user_id
+  and w.external_provider = d.external_provider
+  and w.external_id = d.external_id
+  and (w.created_at, w.id) > (d.created_at, d.id);
+
+-- One row per imported activity; workouts without an external id are not constrained
+alter table public.workouts drop constraint if exists workouts_user_external_key;
+alter table public.workouts
+  add constraint workouts_user_external_key unique (user_id, external_provider, external_id);
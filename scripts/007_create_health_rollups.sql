@@ -0,0 +1,134 @@
+-- Indexes for per-user date range scans of the health tables
+create index if not exists sleep_tracking_user_date_idx on public.sleep_tracking (user_id, date);
+create index if not exists weight_tracking_user_date_idx on public.weight_tracking (user_id, date);
+create index if not exists water_intake_user_date_idx on public.water_intake (user_id, date);
+
+-- Rollups run as the calling user, so RLS and auth.uid() scope them to the user's own rows.
+-- p_period is 'day', 'week' or 'month'; each function returns one row per period with data.
+
+-- Water intake totals per period
+create or replace function public.health_water_rollup(p_start date, p_end date, p_period text)
+returns table (
+  period_start date,
+  total_ml bigint,
+  entries integer,
+  days_logged integer,
+  avg_daily_ml numeric
+)
+language plpgsql
+stable
+set search_path = public
+as $$
+begin
+  if p_period not in ('day', 'week', 'month') then
+    raise exception 'Invalid period: %', p_period;
+  end if;
+
+  return query
+  select
+    date_trunc(p_period, w.date::timestamp)::date as period_start,
+    sum(w.amount_ml)::bigint as total_ml,
+    count(*)::integer as entries,
+    count(distinct w.date)::integer as days_logged,
+    round(sum(w.amount_ml)::numeric / count(distinct w.date), 1) as avg_daily_ml
+  from public.water_intake w
+  where w.user_id = auth.uid()
+    and w.date between p_start and p_end
+  group by 1
+  order by 1;
+end;
+$$;
+
+-- Weight per period with a trailing rolling average over p_window_days
+create or replace function public.health_weight_rollup(p_start date, p_end date, p_period text, p_window_days integer default 7)
+returns table (
+  period_start date,
+  avg_weight_kg numeric,
+  min_weight_kg numeric,
+  max_weight_kg numeric,
+  last_weight_kg numeric,
+  rolling_avg_kg numeric,
+  entries integer
+)
+language plpgsql
+stable
+set search_path = public
+as $$
+begin
+  if p_period not in ('day', 'week', 'month') then
+    raise exception 'Invalid period: %', p_period;
+  end if;
+
+  return query
+  with daily as (
+    -- Days before p_start are read so the first rolling averages have a full window
+    select w.date, avg(w.weight_kg) as weight_kg, count(*) as entries
+    from public.weight_tracking w
+    where w.user_id = auth.uid()
+      and w.date between p_start - (p_window_days - 1) and p_end
+    group by w.date
+  ),
+  rolling as (
+    select
+      d.date,
+      d.weight_kg,
+      d.entries,
+      avg(d.weight_kg) over (
+        order by d.date
+        range between make_interval(days => p_window_days - 1) preceding and current row
+      ) as rolling_avg_kg
+    from daily d
+  )
+  select
+    date_trunc(p_period, r.date::timestamp)::date as period_start,
+    round(avg(r.weight_kg), 2) as avg_weight_kg,
+    round(min(r.weight_kg), 2) as min_weight_kg,
+    round(max(r.weight_kg), 2) as max_weight_kg,
+    round((array_agg(r.weight_kg order by r.date desc))[1], 2) as last_weight_kg,
+    round((array_agg(r.rolling_avg_kg order by r.date desc))[1], 2) as rolling_avg_kg,
+    sum(r.entries)::integer as entries
+  from rolling r
+  where r.date >= p_start
+  group by 1
+  order by 1;
+end;
+$$;
+
+-- Sleep duration and quality averages per period
+create or replace function public.health_sleep_rollup(p_start date, p_end date, p_period text)
+returns table (
+  period_start date,
+  avg_duration_hours numeric,
+  min_duration_hours numeric,
+  max_duration_hours numeric,
+  avg_quality_rating numeric,
+  nights integer
+)
+language plpgsql
+stable
+set search_path = public
+as $$
+begin
+  if p_period not in ('day', 'week', 'month') then
+    raise exception 'Invalid period: %', p_period;
+  end if;
+
+  return query
+  select
+    date_trunc(p_period, s.date::timestamp)::date as period_start,
+    round(avg(s.duration_hours), 2) as avg_duration_hours,
+    min(s.duration_hours) as min_duration_hours,
+    max(s.duration_hours) as max_duration_hours,
+    round(avg(s.quality_rating), 2) as avg_quality_rating,
+    count(*)::integer as nights
+  from public.sleep_tracking s
+  where s.user_id = auth.uid()
+    and s.date between p_start and p_end
+  group by 1
+  order by 1;
+end;
+$$;
+
+grant execute on function public.health_water_rollup(date, date, text) to authenticated;
+grant execute on function public.health_weight_rollup(date, date, text, integer) to authenticated;
+grant execute on function public.health_sleep_rollup(date, date, text) to authenticated;
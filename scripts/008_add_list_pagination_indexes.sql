@@ -0,0 +1,3 @@
+-- Indexes matching the keyset order of the workout and meal lists
+create index if not exists workouts_user_date_id_idx on public.workouts (user_id, scheduled_date, id);
+create index if not exists meals_user_date_id_idx on public.meals (user_id, scheduled_date, id);
@@ -0,0 +1,6 @@
+-- Workouts pushed to Strava were linked with the same provider as imported activities.
+-- Imports always carry their Strava ID in the notes; anything else linked to Strava was pushed.
+update public.workouts
+set external_provider = 'strava_push'
+where external_provider = 'strava'
+  and (notes is null or notes !~ '^Strava ID: \d+');